@@ -1,9 +1,16 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from .sim.store import store
-from .sim.models import NodeCreate, NodeView, MetricsView, RoutingTableView, RouteEntryView
+from fastapi.responses import Response, StreamingResponse
+from .sim.store import Store
+from .sim.mqtt import validate_filter
+from .sim.sessions import sessions, DEFAULT_SESSION
+from .sim.models import NodeCreate, NodeView, MetricsView, RoutingTableView, RouteEntryView, SessionCreate, SweepRequest, TrafficBatch, TrafficSourceCreate
+from .sim.sweep import METRICS
+from .sim.jobs import Job, jobs
 from .sim.types import MacConfig
 import asyncio
+import json
+from typing import Optional
 
 app = FastAPI(title="IoT/MQTT Simulator", version="0.1.0")
 
@@ -17,17 +24,106 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def _startup():
-    # start the background simulation loop
-    asyncio.create_task(store.loop())
+    # start the background scheduler that runs every session's simulation loop
+    asyncio.create_task(sessions.run())
+
+@app.on_event("shutdown")
+async def _shutdown():
+    jobs.shutdown()
+
+def session_store(session: str = DEFAULT_SESSION) -> Store:
+    """Resolve the ?session= query parameter (defaults to the shared session)"""
+    s = sessions.get(session)
+    if s is None:
+        raise HTTPException(status_code=404, detail=f"session {session} not found")
+    return s.store
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+# ---- sessions ----
+
+@app.get("/sessions")
+def list_sessions():
+    return [s.view() for s in sessions.list()]
+
+@app.post("/sessions")
+def create_session(payload: SessionCreate):
+    try:
+        s = sessions.create(
+            cpu_budget=payload.cpuBudgetMs / 1000.0 if payload.cpuBudgetMs is not None else None,
+            array_backed=payload.arrayBacked, batch_mobility=payload.batchMobility, seed=payload.seed,
+            routing=payload.routing, route_tables=payload.routeTables, channel=payload.channel,
+        )
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return s.view()
+
+@app.patch("/sessions/{sid}")
+def update_session(sid: str, cpu_budget_ms: float):
+    s = sessions.get(sid)
+    if s is None:
+        raise HTTPException(status_code=404, detail="session not found")
+    if cpu_budget_ms <= 0:
+        raise HTTPException(status_code=400, detail="cpu_budget_ms must be > 0")
+    s.cpu_budget = cpu_budget_ms / 1000.0
+    return s.view()
+
+@app.delete("/sessions/{sid}")
+def delete_session(sid: str):
+    try:
+        found = sessions.destroy(sid)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not found:
+        raise HTTPException(status_code=404, detail="session not found")
+    return {"ok": True}
+
+def _session(sid: str):
+    s = sessions.get(sid)
+    if s is None:
+        raise HTTPException(status_code=404, detail="session not found")
+    return s
+
+@app.post("/sessions/{sid}/checkpoints")
+def checkpoint_session(sid: str, name: Optional[str] = None):
+    """Snapshot the full simulation state in memory (e.g. once routing has converged)"""
+    _session(sid)
+    name, size = sessions.checkpoint(sid, name)
+    return {"name": name, "bytes": size}
+
+@app.post("/sessions/{sid}/restore")
+def restore_session(sid: str, checkpoint: str):
+    if checkpoint not in _session(sid).checkpoints:
+        raise HTTPException(status_code=404, detail=f"checkpoint {checkpoint} not found")
+    sessions.restore(sid, checkpoint)
+    return _session(sid).view()
+
+@app.post("/sessions/{sid}/fork")
+def fork_session(sid: str, n: int = 1, checkpoint: Optional[str] = None):
+    """Branch n independent what-if sessions from the current state (or a checkpoint)"""
+    s = _session(sid)
+    if n < 1:
+        raise HTTPException(status_code=400, detail="n must be >= 1")
+    if checkpoint is not None and checkpoint not in s.checkpoints:
+        raise HTTPException(status_code=404, detail=f"checkpoint {checkpoint} not found")
+    try:
+        forks = sessions.fork(sid, n, checkpoint)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return [f.view() for f in forks]
+
+@app.get("/sessions/{sid}/snapshot")
+def export_snapshot(sid: str):
+    """Download the session state (load offline with Store.restore; uploads are not accepted since snapshots are pickles)"""
+    return Response(_session(sid).store.snapshot(), media_type="application/octet-stream",
+                    headers={"Content-Disposition": f'attachment; filename="{sid}.snapshot"'})
+
 # ---- nodes ----
 
 @app.get("/nodes", response_model=list[NodeView])
-def list_nodes():
+def list_nodes(store: Store = Depends(session_store)):
     return [
         NodeView(
             id=n.id, role=n.role, phy=n.phy,
@@ -40,9 +136,9 @@ def list_nodes():
     ]
 
 @app.post("/nodes", response_model=NodeView)
-def add_node(payload: NodeCreate):
+def add_node(payload: NodeCreate, store: Store = Depends(session_store)):
     nid = store.add_node(payload.role, payload.phy, payload.x, payload.y, payload.mobile, payload.speed, payload.sleepRatio)
-    n = next(n for n in store.nodes if n.id == nid)
+    n = store.get_node(nid)
     return NodeView(
         id=n.id, role=n.role, phy=n.phy,
         x=n.pos.x, y=n.pos.y,
@@ -52,44 +148,104 @@ def add_node(payload: NodeCreate):
     )
 
 @app.delete("/nodes/{nid}")
-def delete_node(nid: int):
-    if not any(n.id == nid for n in store.nodes):
+def delete_node(nid: int, store: Store = Depends(session_store)):
+    if store.get_node(nid) is None:
         raise HTTPException(status_code=404, detail="node not found")
     store.remove_node(nid)
     return {"ok": True}
 
 @app.post("/traffic")
-def traffic(src: int, dst: int, n: int = 1, size: int = 100, kind: str = "WiFi"):
+def traffic(src: int, dst: int, n: int = 1, size: int = 100, kind: str = "WiFi", store: Store = Depends(session_store)):
     enq = store.enqueue(src_id=src, dst_id=dst, n=n, size=size, kind=kind)
     return {"enqueued_ok": enq}
 
+@app.post("/traffic/batch")
+def traffic_batch(payload: TrafficBatch, animate: bool = True, store: Store = Depends(session_store)):
+    """Enqueue many flows in one call; per-flow accepted/dropped counts (dropped = refused or queue full)"""
+    results = store.enqueue_batch([(f.src, f.dst, f.n, f.size, f.kind) for f in payload.flows], animate=animate)
+    return {
+        "accepted": sum(r[0] for r in results),
+        "dropped": sum(r[1] for r in results),
+        "flows": [
+            {"src": f.src, "dst": f.dst, "accepted": accepted, "dropped": dropped, "reason": reason}
+            for f, (accepted, dropped, reason) in zip(payload.flows, results)
+        ],
+    }
+
+@app.post("/traffic/sources")
+def add_traffic_source(payload: TrafficSourceCreate, store: Store = Depends(session_store)):
+    """Attach a generator that emits packets on the simulation clock"""
+    options = {"pick": payload.pick, "size": payload.size, "start": payload.start, "stop": payload.stop,
+               "count": payload.count, "animate": payload.animate}
+    if payload.kind == "onoff":
+        options.update(on_mean=payload.onMean, off_mean=payload.offMean)
+    try:
+        source = store.add_traffic(payload.kind, payload.node, payload.rate, payload.dsts, **options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return source.view()
+
+@app.get("/traffic/sources")
+def list_traffic_sources(store: Store = Depends(session_store)):
+    return [s.view() for s in store.traffic_sources.values()]
+
+@app.delete("/traffic/sources/{source_id}")
+def remove_traffic_source(source_id: int, store: Store = Depends(session_store)):
+    if not store.remove_traffic(source_id):
+        raise HTTPException(status_code=404, detail="traffic source not found")
+    return {"ok": True}
+
 # ---- control ----
 
 @app.post("/control/start")
-def start():
+def start(store: Store = Depends(session_store)):
     store.running = True
     return {"running": store.running}
 
 @app.post("/control/pause")
-def pause():
-    store.running = False
+def pause(store: Store = Depends(session_store)):
+    store.pause()
     return {"running": store.running}
 
 @app.post("/control/reset")
-def reset():
+def reset(store: Store = Depends(session_store)):
     store.reset()
     return {"ok": True}
 
+@app.post("/control/speed")
+def set_speed(factor: float = 1.0, store: Store = Depends(session_store)):
+    """Set sim speed as a multiple of real time (0 = as fast as possible)"""
+    store.set_speed(factor)
+    return {"speed": store.speed, "running": store.running}
+
+@app.post("/control/routing")
+def set_routing(mode: str, store: Store = Depends(session_store)):
+    """Routing mode: "dv" (distance-vector protocol), "jacobi" (distance vector in synchronous rounds, array tables only) or "oracle" (shortest paths from the live topology)"""
+    try:
+        store.set_routing(mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"routing": store.routing}
+
+@app.post("/control/run-until")
+async def run_until(t: float, store: Store = Depends(session_store)):
+    """Run the simulation until sim time t; returns once it gets there"""
+    if t < 0:
+        raise HTTPException(status_code=400, detail="t must be >= 0")
+    now = await store.run_until(t)
+    return {"now": now, "running": store.running}
+
 # ---- metrics (placeholder in PR1) ----
 
 @app.get("/metrics", response_model=MetricsView)
-def metrics():
+def metrics(store: Store = Depends(session_store)):
     now = store.engine.now
     m = store.mac.metrics
     delivered = m.dequeued_ok
     duplicates = m.duplicates
     pdr = m.pdr
     avg_latency_ms = (m.rtt_ms_total / m.rtt_samples) if m.rtt_samples else 0.0
+    p = m.latency.percentiles((50, 95, 99))
     
     # Calculate average energy and total awake time
     total_energy = sum(n.energy for n in store.nodes)
@@ -103,15 +259,44 @@ def metrics():
         delivered=delivered, 
         duplicates=duplicates,
         avgEnergy=avg_energy,
-        totalAwakeTime=total_awake_time
+        totalAwakeTime=total_awake_time,
+        p50LatencyMs=p[50],
+        p95LatencyMs=p[95],
+        p99LatencyMs=p[99],
     )
 
+@app.get("/metrics/latency")
+def latency_metrics(flows: bool = True, store: Store = Depends(session_store)):
+    """Latency distribution (ms) overall, per PHY and per (origin, destination) flow"""
+    m = store.mac.metrics
+    return {
+        "overall": m.latency.summary(),
+        "byPhy": {kind: h.summary() for kind, h in sorted(m.latency_by_phy.items())},
+        "byFlow": [{"src": src, "dst": dst, **h.summary()} for (src, dst), h in sorted(m.latency_by_flow.items())] if flows else [],
+    }
+
+@app.get("/metrics/cache")
+def cache_metrics(store: Store = Depends(session_store)):
+    """Neighbor cache hit/miss counters (for tuning)"""
+    return {"neighbor_cache": store.neighbor_cache.stats()}
+
+# ---- topology ----
+
+@app.get("/topology")
+def topology(since: int = -1, store: Store = Depends(session_store)):
+    """All PHY links for the current topology version (unchanged=True if the client already has it)"""
+    version = store.topology_version
+    if since == version:
+        return {"version": version, "unchanged": True}
+    links = store.links()
+    return {"version": version, "unchanged": False, "links": [[a, b] for a, b in links.edges()]}
+
 # ---- network layer ----
 
 @app.get("/routing/{node_id}", response_model=RoutingTableView)
-def get_routing_table(node_id: int):
+def get_routing_table(node_id: int, store: Store = Depends(session_store)):
     """Get routing table for a specific node"""
-    if not any(n.id == node_id for n in store.nodes):
+    if store.get_node(node_id) is None:
         raise HTTPException(status_code=404, detail="node not found")
     
     routes_dict = store.network.get_routing_table(node_id)
@@ -122,7 +307,7 @@ def get_routing_table(node_id: int):
     return RoutingTableView(nodeId=node_id, routes=routes)
 
 @app.get("/routing", response_model=list[RoutingTableView])
-def get_all_routing_tables():
+def get_all_routing_tables(store: Store = Depends(session_store)):
     """Get routing tables for all nodes"""
     tables = []
     for node in store.nodes:
@@ -137,11 +322,16 @@ def get_all_routing_tables():
 # ---- MQTT ----
 
 @app.post("/mqtt/subscribe")
-def mqtt_subscribe(client_id: int, topic: str, qos: int = 0):
+def mqtt_subscribe(client_id: int, topic: str, qos: int = 0, store: Store = Depends(session_store)):
     """Subscribe a client to an MQTT topic"""
     if client_id not in store.mqtt_clients:
         raise HTTPException(status_code=404, detail="client not found")
     
+    try:
+        validate_filter(topic)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     client = store.mqtt_clients[client_id]
     client.subscribed_topics.add(topic)
     
@@ -156,10 +346,12 @@ def mqtt_subscribe(client_id: int, topic: str, qos: int = 0):
     return {"ok": True, "topic": topic, "retained_messages": len(retained_msgs)}
 
 @app.post("/mqtt/publish")
-def mqtt_publish(publisher_id: int, topic: str, payload: str, qos: int = 0, retained: bool = False):
+def mqtt_publish(publisher_id: int, topic: str, payload: str, qos: int = 0, retained: bool = False, store: Store = Depends(session_store)):
     """Publish an MQTT message"""
     if publisher_id not in store.mqtt_clients:
         raise HTTPException(status_code=404, detail=f"publisher {publisher_id} not found. Available clients: {list(store.mqtt_clients.keys())}")
+    if "+" in topic or "#" in topic:
+        raise HTTPException(status_code=400, detail="wildcards are only allowed in subscription filters")
     
     # Find broker
     broker_id = next(iter(store.mqtt_brokers.keys()), None)
@@ -178,8 +370,8 @@ def mqtt_publish(publisher_id: int, topic: str, payload: str, qos: int = 0, reta
     
     # Add publisher→broker packet animation
     pub_pkt_id = f"pub-{publisher_id}-{broker_id}-{msg_id}"
-    pub_node = next((n for n in store.nodes if n.id == publisher_id), None)
-    broker_node = next((n for n in store.nodes if n.id == broker_id), None)
+    pub_node = store.get_node(publisher_id)
+    broker_node = store.get_node(broker_id)
     if pub_node and broker_node:
         store.mqtt_packets_in_flight.append({
             'id': pub_pkt_id,
@@ -198,14 +390,15 @@ def mqtt_publish(publisher_id: int, topic: str, payload: str, qos: int = 0, reta
     
     # Queue broker publish to happen AFTER publisher->broker packet arrives
     store.mqtt_pending_broker_publish.append((broker_id, message, pub_pkt_id))
+    store.wake_mqtt()
     
     # Get subscriber count for response (before actual publish)
     broker = store.mqtt_brokers[broker_id]
-    subscriber_count = len(broker.subscriptions.get(message.topic, {}))
+    subscribers = broker.subscribers(message.topic)
+    subscriber_count = len(subscribers)
     
     # Queue publisher ACK only if QoS 1 AND at least one subscriber has QoS 1
     if qos == 1:
-        subscribers = broker.subscriptions.get(message.topic, {})
         has_qos1_subscriber = any(sub_qos == 1 for sub_qos in subscribers.values())
         if has_qos1_subscriber:
             store.mqtt_pending_pub_acks.append((publisher_id, broker_id, msg_id))
@@ -213,7 +406,7 @@ def mqtt_publish(publisher_id: int, topic: str, payload: str, qos: int = 0, reta
     return {"ok": True, "msg_id": msg_id, "subscribers": subscriber_count}
 
 @app.get("/mqtt/stats")
-def mqtt_stats():
+def mqtt_stats(store: Store = Depends(session_store)):
     """Get MQTT statistics"""
     broker_stats = {}
     for broker_id, broker in store.mqtt_brokers.items():
@@ -244,11 +437,10 @@ def mqtt_stats():
     }
 
 @app.post("/mqtt/reset")
-def mqtt_reset():
+def mqtt_reset(store: Store = Depends(session_store)):
     """Reset MQTT subscriptions and stats"""
     for broker in store.mqtt_brokers.values():
-        broker.subscriptions.clear()
-        broker.retained_messages.clear()
+        broker.clear_topics()
         broker.pending_acks.clear()
         broker.message_queue.clear()
         broker.stats = {
@@ -279,7 +471,7 @@ def mqtt_reset():
     return {"ok": True}
 
 @app.get("/mqtt/packets")
-def mqtt_packets():
+def mqtt_packets(store: Store = Depends(session_store)):
     """Get MQTT packets in flight for visualization"""
     return {
         "packets": store.mqtt_packets_in_flight,
@@ -287,12 +479,12 @@ def mqtt_packets():
     }
 
 @app.get("/mac/packets")
-def mac_packets():
+def mac_packets(store: Store = Depends(session_store)):
     """Get MAC packets in flight for visualization"""
     return {"packets": store.mac_packets_in_flight}
 
 @app.get("/mqtt/reconnections")
-def mqtt_reconnections():
+def mqtt_reconnections(store: Store = Depends(session_store)):
     """Get recent reconnection wave events"""
     current_time = store.engine.now
     # Return reconnections from last 5 seconds
@@ -300,116 +492,100 @@ def mqtt_reconnections():
     return {"reconnections": recent}
 
 @app.get("/mqtt/topics")
-def mqtt_topics():
+def mqtt_topics(store: Store = Depends(session_store)):
     """Get topic message counts for heatmap"""
     return {"topics": store.topic_message_counts}
 
 @app.post("/broker/relocate")
-def broker_relocate(broker_id: int, x: float, y: float):
+def broker_relocate(broker_id: int, x: float, y: float, store: Store = Depends(session_store)):
     """Relocate broker (simulates failover)"""
     new_id = store.relocate_broker(broker_id, x, y)
     return {"ok": True, "broker_id": new_id, "x": x, "y": y}
 
 # ---- Experiments ----
 
+def _flatten(point: dict) -> dict:
+    """Sweep result in the legacy single-run shape (means) plus CI half-widths"""
+    runs = point["runs"]
+    return {
+        **{name: point[name]["mean"] for name in METRICS},
+        "enqueued": runs[0]["enqueued"] if runs else 0,
+        "simulation_time": runs[0]["simulation_time"] if runs else 0.0,
+        "replications": len(runs),
+        "ci95": {name: point[name]["ci95"] for name in METRICS},
+    }
+
+async def _sweep(points, seeds):
+    # same path as /jobs, so repeated experiments come straight from the result cache
+    job = await jobs.submit(points, seeds).wait()
+    if job.status != "done":
+        raise HTTPException(status_code=500, detail=job.error or f"experiment {job.status}")
+    return job.results
+
 @app.post("/experiment/duty-cycle")
-async def run_duty_cycle_experiment():
-    """Run duty cycle experiment with different sleep ratios"""
-    results = []
+async def run_duty_cycle_experiment(replications: int = 1, seed: int = 123):
+    """Run duty cycle experiment with different sleep ratios (3 WiFi nodes in a line, headless)"""
+    if replications < 1:
+        raise HTTPException(status_code=400, detail="replications must be >= 1")
     sleep_ratios = [0.0, 0.2, 0.4, 0.6, 0.8]
-    
-    for sleep_ratio in sleep_ratios:
-        # Stop current simulation
-        store.running = False
-        await asyncio.sleep(0.5)
-        
-        # Reset simulation
-        store.reset()
-        
-        # Create topology: 3 nodes in a line (within WiFi range: 55 units)
-        n1 = store.add_node("sensor", "WiFi", 100, 100, sleep_ratio=sleep_ratio)
-        n2 = store.add_node("sensor", "WiFi", 130, 100, sleep_ratio=sleep_ratio)
-        n3 = store.add_node("sensor", "WiFi", 160, 100, sleep_ratio=sleep_ratio)
-        
-        # Start simulation
-        store.running = True
-        
-        # Wait for routing to stabilize (route advertisements happen every 5s)
-        await asyncio.sleep(6)
-        
-        # Send traffic from node 1 to node 3
-        enqueued = store.enqueue(n1, n3, n=30, size=100, kind="WiFi")
-        
-        # Wait for packets to be delivered
-        await asyncio.sleep(10)
-        
-        # Collect metrics
-        m = store.mac.metrics
-        avg_energy = sum(n.energy for n in store.nodes) / len(store.nodes) if store.nodes else 100.0
-        avg_latency = (m.rtt_ms_total / m.rtt_samples) if m.rtt_samples else 0.0
-        
-        results.append({
-            "sleep_ratio": sleep_ratio,
-            "avg_energy": avg_energy,
-            "avg_latency_ms": avg_latency,
-            "pdr": m.pdr,
-            "delivered": m.dequeued_ok,
-            "enqueued": enqueued,
-            "simulation_time": store.engine.now
-        })
-    
-    # Stop simulation
-    store.running = False
-    
-    return {"results": results}
+    points = [{"phy": "WiFi", "sleep_ratio": r} for r in sleep_ratios]
+    swept = await _sweep(points, range(seed, seed + replications))
+    return {"results": [{"sleep_ratio": r, **_flatten(p)} for r, p in zip(sleep_ratios, swept)]}
 
 @app.post("/experiment/phy-comparison")
-async def run_phy_comparison():
-    """Compare BLE vs WiFi performance"""
-    results = {}
-    
-    for phy in ["WiFi", "BLE"]:
-        # Stop current simulation
-        store.running = False
-        await asyncio.sleep(0.5)
-        
-        # Reset simulation
-        store.reset()
-        
-        # Create topology: 3 nodes in a line (within range)
-        # BLE range: 15 units, WiFi range: 55 units
-        spacing = 12 if phy == "BLE" else 30
-        n1 = store.add_node("sensor", phy, 100, 100, sleep_ratio=0.0)
-        n2 = store.add_node("sensor", phy, 100 + spacing, 100, sleep_ratio=0.0)
-        n3 = store.add_node("sensor", phy, 100 + spacing * 2, 100, sleep_ratio=0.0)
-        
-        # Start simulation
-        store.running = True
-        
-        # Wait for routing (route advertisements happen every 5s)
-        await asyncio.sleep(6)
-        
-        # Send traffic from node 1 to node 3
-        enqueued = store.enqueue(n1, n3, n=30, size=100, kind=phy)
-        
-        # Wait for packets to be delivered
-        await asyncio.sleep(10)
-        
-        # Collect metrics
-        m = store.mac.metrics
-        avg_energy = sum(n.energy for n in store.nodes) / len(store.nodes) if store.nodes else 100.0
-        avg_latency = (m.rtt_ms_total / m.rtt_samples) if m.rtt_samples else 0.0
-        
-        results[phy] = {
-            "avg_energy": avg_energy,
-            "avg_latency_ms": avg_latency,
-            "pdr": m.pdr,
-            "delivered": m.dequeued_ok,
-            "simulation_time": store.engine.now,
-            "enqueued": enqueued
-        }
-    
-    # Stop simulation
-    store.running = False
-    
-    return {"results": results}
+async def run_phy_comparison(replications: int = 1, seed: int = 123):
+    """Compare BLE vs WiFi performance (3 nodes in a line within range, headless)"""
+    if replications < 1:
+        raise HTTPException(status_code=400, detail="replications must be >= 1")
+    phys = ["WiFi", "BLE"]
+    swept = await _sweep([{"phy": phy, "sleep_ratio": 0.0} for phy in phys], range(seed, seed + replications))
+    return {"results": {phy: _flatten(p) for phy, p in zip(phys, swept)}}
+
+@app.post("/experiment/sweep")
+async def run_parameter_sweep(req: SweepRequest):
+    """Run every parameter set under every seed in a process pool; metrics aggregated with 95% CIs"""
+    return {"results": await _sweep(req.points, _seeds(req))}
+
+# ---- experiment jobs ----
+
+def _seeds(req: SweepRequest):
+    return req.seeds if req.seeds else range(req.seed, req.seed + req.replications)
+
+def _job(job_id: str) -> Job:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"job {job_id} not found")
+    return job
+
+@app.post("/jobs")
+async def submit_job(req: SweepRequest):
+    """Queue a sweep and return immediately; poll /jobs/{id} or stream /jobs/{id}/stream"""
+    return jobs.submit(req.points, _seeds(req)).view()
+
+@app.get("/jobs")
+def list_jobs():
+    return [j.view() for j in jobs.list()]
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    return _job(job_id).view(with_results=True)
+
+@app.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str):
+    """Server-sent events: one progress event per change, the last one carries the results"""
+    job = _job(job_id)
+
+    async def events():
+        while True:
+            done = job.done
+            yield f"data: {json.dumps(job.view(with_results=done))}\n\n"
+            if done:
+                return
+            await job.wait_change(timeout=15.0)  # also acts as a keep-alive
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    job = _job(job_id)
+    return {"ok": jobs.cancel(job_id), "status": job.status}
@@ -1,6 +1,8 @@
 from __future__ import annotations
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
+import heapq
 import math
+import time
 
 from .models import Node, Position
 
@@ -18,6 +20,12 @@ def in_range(a: Node, b: Node) -> bool:
     rb = PHY_PROFILES[b.phy]["range"]
     return dist(a.pos, b.pos) <= min(ra, rb)
 
+def awake_time(sleep_ratio: float, t: float, cycle_time: float = 1.0) -> float:
+    """Total time spent awake in [0, t] under the duty cycle (asleep for the first sleep_ratio of each cycle)"""
+    cycles, phase = divmod(t, cycle_time)
+    sleep_span = cycle_time * sleep_ratio
+    return cycles * (cycle_time - sleep_span) + max(0.0, phase - sleep_span)
+
 def energy_tick(n: Node, dt: float, sim_time: float):
     prof = PHY_PROFILES[n.phy]
     
@@ -27,15 +35,82 @@ def energy_tick(n: Node, dt: float, sim_time: float):
     time_in_cycle = sim_time % cycle_time
     n.awake = time_in_cycle > (cycle_time * n.sleep_ratio)
     
-    n.energy -= (prof["idle_energy"] if n.awake else prof["sleep_energy"]) * dt
+    # Integrate over [sim_time - dt, sim_time] so long (skipped) intervals are charged exactly
+    awake = awake_time(n.sleep_ratio, sim_time, cycle_time) - awake_time(n.sleep_ratio, sim_time - dt, cycle_time)
+    n.energy -= prof["idle_energy"] * awake + prof["sleep_energy"] * (dt - awake)
     if n.energy < 0:
         n.energy = 0
 
-class Engine:
+class Scheduler:
+    """
+    Discrete-event scheduler: binary heap of [time, seq, callback, args].
+    seq keeps same-time events in FIFO order; cancelled events are dropped lazily.
+    """
     def __init__(self):
+        self._heap: List[list] = []
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, at: float, callback: Callable, *args) -> list:
+        """Schedule callback(*args) at sim time `at`. Returns a handle for cancel()."""
+        ev = [at, self._seq, callback, args]
+        self._seq += 1
+        heapq.heappush(self._heap, ev)
+        return ev
+
+    def cancel(self, ev: Optional[list]):
+        if ev is not None:
+            ev[2] = None
+
+    def peek_time(self) -> Optional[float]:
+        """Time of the next live event, None if the queue is empty"""
+        heap = self._heap
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def pop_due(self, until: float) -> Optional[list]:
+        """Pop the next live event with time <= until"""
+        t = self.peek_time()
+        if t is None or t > until:
+            return None
+        return heapq.heappop(self._heap)
+
+class Engine:
+    def __init__(self, arrays=None):
         self.now: float = 0.0
+        self.energy_time: float = 0.0  # sim time up to which node energy has been integrated
+        self.scheduler = Scheduler()
+        self.arrays = arrays  # optional NodeArrays: vectorized energy instead of per-node energy_tick
+
+    def settle(self, nodes: List[Node]):
+        """Integrate node energy / duty cycle up to the current sim time"""
+        dt = self.now - self.energy_time
+        if dt <= 0:
+            return
+        if self.arrays is not None:
+            self.arrays.energy_tick(dt, self.now)
+        else:
+            for n in nodes:
+                energy_tick(n, dt, self.now)
+        self.energy_time = self.now
 
-    def tick(self, nodes: List[Node], dt: float):
-        self.now += dt
-        for n in nodes:
-            energy_tick(n, dt, self.now)
+    def run_until(self, until: float, deadline: Optional[float] = None) -> bool:
+        """
+        Fire scheduled events in time order up to `until`, jumping over idle gaps.
+        Returns False if the wall clock passed `deadline` (time.perf_counter()) first.
+        """
+        sched = self.scheduler
+        while True:
+            ev = sched.pop_due(until)
+            if ev is None:
+                break
+            self.now = ev[0]
+            ev[2](*ev[3])
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+        if until != math.inf and until > self.now:
+            self.now = until
+        return True
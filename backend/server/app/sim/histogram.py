@@ -0,0 +1,107 @@
+"""
+Latency histograms
+- Log-linear buckets (HDR style): 32 linear sub-buckets per power of two, ~3% relative error
+- Fixed memory per histogram; recording is O(1) and never grows any structure
+- Histograms merge by adding bucket counts, so per-flow ones roll up into per-PHY or overall views
+"""
+from __future__ import annotations
+from array import array
+from typing import Dict, Iterable, Optional, Sequence
+
+SUB_BITS = 5
+SUB = 1 << SUB_BITS
+MAX_BITS = 32  # values are clamped to 2^32 units (~72 minutes at 1 us resolution)
+N_BUCKETS = (MAX_BITS - SUB_BITS + 1) * SUB
+
+def bucket_of(v: int) -> int:
+    if v < 2 * SUB:
+        return v
+    e = v.bit_length() - SUB_BITS - 1
+    return e * SUB + (v >> e)
+
+def bucket_bounds(i: int) -> tuple:
+    """[low, high) range of values that fall into bucket i"""
+    if i < 2 * SUB:
+        return i, i + 1
+    e = i // SUB - 1
+    m = i - e * SUB
+    return m << e, (m + 1) << e
+
+class LatencyHistogram:
+    """Latency distribution in milliseconds, stored at `unit_ms` resolution (default 1 us)"""
+
+    def __init__(self, unit_ms: float = 0.001):
+        self.unit_ms = unit_ms
+        self.counts = array("Q", bytes(8 * N_BUCKETS))
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms: Optional[float] = None
+        self.max_ms: Optional[float] = None
+        self._top = (1 << MAX_BITS) - 1
+
+    def record(self, ms: float):
+        v = int(ms / self.unit_ms)
+        self.counts[bucket_of(v if v < self._top else self._top)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if self.min_ms is None or ms < self.min_ms:
+            self.min_ms = ms
+        if self.max_ms is None or ms > self.max_ms:
+            self.max_ms = ms
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        """Add other's samples into this histogram (same unit)"""
+        if other.unit_ms != self.unit_ms:
+            raise ValueError("cannot merge histograms with different units")
+        counts = self.counts
+        for i, c in enumerate(other.counts):
+            if c:
+                counts[i] += c
+        self.count += other.count
+        self.total_ms += other.total_ms
+        for ms in (other.min_ms, other.max_ms):
+            if ms is not None:
+                self.min_ms = ms if self.min_ms is None else min(self.min_ms, ms)
+                self.max_ms = ms if self.max_ms is None else max(self.max_ms, ms)
+        return self
+
+    def percentiles(self, ps: Sequence[float]) -> Dict[float, float]:
+        """Values at the given percentiles (0-100), one pass over the buckets"""
+        out: Dict[float, float] = {}
+        if not self.count:
+            return {p: 0.0 for p in ps}
+        targets = sorted((max(1, -(-p * self.count // 100)), p) for p in ps)  # rank of each percentile
+        seen = 0
+        k = 0
+        for i, c in enumerate(self.counts):
+            if not c:
+                continue
+            seen += c
+            while k < len(targets) and targets[k][0] <= seen:
+                lo, hi = bucket_bounds(i)
+                # Midpoint of the bucket, kept within the observed range
+                out[targets[k][1]] = min(max((lo + hi) / 2 * self.unit_ms, self.min_ms), self.max_ms)
+                k += 1
+            if k == len(targets):
+                break
+        return out
+
+    def percentile(self, p: float) -> float:
+        return self.percentiles([p])[p]
+
+    def summary(self, ps: Iterable[float] = (50, 95, 99)) -> dict:
+        ps = list(ps)
+        values = self.percentiles(ps)
+        return {
+            "count": self.count,
+            "mean": (self.total_ms / self.count) if self.count else 0.0,
+            "min": self.min_ms or 0.0,
+            "max": self.max_ms or 0.0,
+            **{f"p{p:g}": values[p] for p in ps},
+        }
+
+def merged(hists: Iterable[LatencyHistogram]) -> LatencyHistogram:
+    out = LatencyHistogram()
+    for h in hists:
+        out.merge(h)
+    return out
@@ -0,0 +1,218 @@
+"""
+Experiment jobs
+- Submit a sweep spec, get a job id back; points run in a shared process pool
+- Progress can be polled or streamed, and a job can be cancelled
+- Every (point, seed) result is cached on disk, keyed by a hash of the scenario,
+  the effective MacConfig, the PHY profiles and the seed
+"""
+from __future__ import annotations
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, fields
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from .engine import PHY_PROFILES
+from .sweep import aggregate, run_point
+from .types import MacConfig
+
+CACHE_VERSION = 4  # bump when run_point's semantics change so stale results miss
+DEFAULT_CACHE_DIR = Path(os.environ.get("SIM_CACHE_DIR", Path(__file__).resolve().parents[2] / ".experiment_cache"))
+
+def point_key(params: dict, seed: int) -> str:
+    """Content hash of everything that determines one run's result"""
+    mac = asdict(MacConfig())
+    mac_fields = {f.name for f in fields(MacConfig)}
+    mac.update({k: v for k, v in params.get("mac", {}).items() if k in mac_fields})
+    scenario = {k: v for k, v in params.items() if k != "mac"}
+    blob = json.dumps(
+        {"v": CACHE_VERSION, "scenario": scenario, "mac": mac, "phy": PHY_PROFILES, "seed": seed},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+class ResultCache:
+    """One JSON file per cached run under root/<first 2 hex chars>/<key>.json"""
+
+    def __init__(self, root: Path = DEFAULT_CACHE_DIR):
+        self.root = Path(root)
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._path(key)) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: dict):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(result, f)
+        os.replace(tmp, path)  # atomic, so readers never see a partial file
+
+class Job:
+    """One submitted sweep"""
+
+    def __init__(self, job_id: str, points: List[dict], seeds: List[int]):
+        self.id = job_id
+        self.points = points
+        self.seeds = seeds
+        self.status = "queued"          # queued | running | done | failed | cancelled
+        self.total = len(points) * len(seeds)
+        self.completed = 0
+        self.cached = 0                 # runs answered from the result cache
+        self.runs: Dict[int, Dict[int, dict]] = {i: {} for i in range(len(points))}  # point -> seed -> result
+        self.results: Optional[List[dict]] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def _record(self, i: int, seed: int, result: dict, cached: bool):
+        self.runs[i][seed] = result
+        self.completed += 1
+        self.cached += cached
+        self._notify()
+
+    def _finish(self, status: str, error: Optional[str] = None):
+        self.status = status
+        self.error = error
+        self.finished = time.time()
+        if status == "done":
+            self.results = [aggregate(p, [self.runs[i][s] for s in self.seeds]) for i, p in enumerate(self.points)]
+        self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_change(self, timeout: Optional[float] = None):
+        """Wait until progress or status changes (or the timeout passes)"""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def wait(self) -> "Job":
+        while not self.done:
+            await self.wait_change()
+        return self
+
+    def view(self, with_results: bool = False) -> dict:
+        v = {
+            "id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "completed": self.completed,
+            "cached": self.cached,
+            "progress": (self.completed / self.total) if self.total else 1.0,
+            "error": self.error,
+            "created": self.created,
+            "finished": self.finished,
+        }
+        if with_results:
+            v["results"] = self.results
+        return v
+
+class JobManager:
+    """Job registry plus the process pool and result cache shared by all jobs"""
+
+    def __init__(self, cache: Optional[ResultCache] = None, max_workers: Optional[int] = None, max_jobs: int = 100):
+        self.cache = cache or ResultCache()
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs        # finished jobs beyond this are forgotten, oldest first
+        self.jobs: Dict[str, Job] = {}
+        self._ids = itertools.count(1)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def submit(self, points: Sequence[dict], seeds: Iterable[int]) -> Job:
+        """Queue a sweep (must be called from the event loop)"""
+        job = Job(f"j{next(self._ids)}", list(points), list(dict.fromkeys(seeds)))
+        self.jobs[job.id] = job
+        self._prune()
+        job.task = asyncio.get_running_loop().create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        return list(self.jobs.values())
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None or job.done:
+            return False
+        if job.task is not None:
+            job.task.cancel()
+        return True
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _prune(self):
+        finished = [j for j in self.jobs.values() if j.done]
+        for job in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job.id]
+
+    async def _run(self, job: Job):
+        loop = asyncio.get_running_loop()
+        job.status = "running"
+        job._notify()
+        pending: Dict[asyncio.Future, tuple] = {}
+        try:
+            for i, params in enumerate(job.points):
+                for seed in job.seeds:
+                    key = point_key(params, seed)
+                    hit = self.cache.get(key)
+                    if hit is not None:
+                        job._record(i, seed, hit, cached=True)
+                    else:
+                        pending[loop.run_in_executor(self.pool, run_point, params, seed)] = (i, seed, key)
+            while pending:
+                finished, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in finished:
+                    i, seed, key = pending.pop(fut)
+                    result = fut.result()
+                    self.cache.put(key, result)
+                    job._record(i, seed, result, cached=False)
+        except asyncio.CancelledError:
+            for fut in pending:
+                fut.cancel()  # drops runs that have not started yet
+            job._finish("cancelled")
+        except Exception as e:
+            for fut in pending:
+                fut.cancel()
+            job._finish("failed", f"{type(e).__name__}: {e}")
+        else:
+            job._finish("done")
+
+jobs = JobManager()
@@ -1,12 +1,13 @@
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import Dict, Deque, Optional, Set, Tuple
+from typing import Callable, Dict, Deque, FrozenSet, List, Optional, Set, Tuple
 from collections import deque
 import random
 
+from .histogram import LatencyHistogram
 from .types import Packet, MacConfig, MacKind
 
-@dataclass
+@dataclass(slots=True)
 class TxQueue:
     """ 
     Transmit FIFO Queue for outgoing packets
@@ -31,20 +32,108 @@ class TxQueue:
 @dataclass
 class Channel:
     """
-    Shared medium for slot for tracking transmission use and collisions
+    Shared medium for slot for tracking transmission use and collisions.
+    With `neighbors` set, carrier sense and collisions are per neighborhood (spatial reuse):
+    a node senses only transmitters in its interference range, and a receiver in range
+    of two or more transmitters loses the frame
     """
     tx_in_slot: Dict[int, Packet] = field(default_factory=dict)
+    neighbors: Optional[Callable[[int], FrozenSet[int]]] = None  # node -> ids within interference range
+    heard: Set[int] = field(default_factory=set)                 # nodes in range of a transmitter this slot
+    jammed: Set[int] = field(default_factory=set)                # nodes in range of two or more
+
+    def clear(self):
+        self.tx_in_slot.clear()
+        self.heard.clear()
+        self.jammed.clear()
+
+    def is_busy(self, nid: Optional[int] = None) -> bool:                          # carrier sense (at nid, if spatial)
+        if self.neighbors is None or nid is None:
+            return bool(self.tx_in_slot)
+        return nid in self.heard
+
+    def start_tx(self, nid: int, pkt: Packet):                                      # marks node as transmitter
+        self.tx_in_slot[nid] = pkt
+        if self.neighbors is not None:
+            around = self.neighbors(nid)
+            self.jammed |= self.heard & around
+            self.heard |= around
 
-    def clear(self): self.tx_in_slot.clear()
-    def is_busy(self) -> bool: return bool(self.tx_in_slot)
-    def start_tx(self, nid: int, pkt: Packet): self.tx_in_slot[nid] = pkt           # marks node as transmitter
-    def end_slot(self) -> Tuple[bool, Set[int]]:                                    # clears state and returns collisions (if any)
-        nodes = set(self.tx_in_slot.keys())
-        collision = len(nodes) > 1
+    def end_slot(self) -> Tuple[Set[int], List[int]]:                               # clears state and returns (collided, transmitters)
+        nodes = list(self.tx_in_slot)
+        if self.neighbors is None:
+            collided = set(nodes) if len(nodes) > 1 else set()
+        else:
+            collided = {nid for nid, pkt in self.tx_in_slot.items()
+                        if pkt.next_hop_id in self.jammed or pkt.next_hop_id in self.tx_in_slot}
         self.clear()
-        return collision, nodes
+        return collided, nodes
         
 @dataclass
+class ReplayWindow:
+    """
+    Per-flow duplicate detection with bounded memory (as in IPsec anti-replay): the highest
+    sequence number seen on each (src, dst) flow plus a bitmap of the `size` numbers below it
+    """
+    size: int = 4096
+    flows: Dict[Tuple[int, int], List[int]] = field(default_factory=dict)  # (src, dst) -> [highest seq, bitmap]
+    stale: int = 0                                                          # packets older than the window (not checked)
+
+    def check(self, src: int, dst: int, seq: int) -> bool:                 # True if already seen, else records it
+        w = self.flows.get((src, dst))
+        if w is None:
+            self.flows[(src, dst)] = [seq, 1]
+            return False
+        top, bits = w
+        if seq > top:                                                       # slide the window forward
+            shift = seq - top
+            w[0] = seq
+            w[1] = ((bits << shift) | 1) & ((1 << self.size) - 1) if shift < self.size else 1
+            return False
+        offset = top - seq
+        if offset >= self.size:                                             # too old to tell: accept it
+            self.stale += 1
+            return False
+        bit = 1 << offset
+        if bits & bit:
+            return True
+        w[1] = bits | bit
+        return False
+
+class PacketPool:
+    """
+    Free-list of Packet objects: packets that left the MAC (delivered, forwarded on as a
+    new hop, dropped) are handed out again instead of allocating one per hop
+    """
+    def __init__(self, limit: int = 4096):
+        self.free: List[Packet] = []
+        self.limit = limit          # max packets kept around for reuse
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, src_id: int, dst_id: int, size_bytes: int, kind: str, seq: int = 0,
+                t_created: float = 0.0, next_hop_id: int = 0, origin_id: int = 0, hops: int = 0) -> Packet:
+        if not self.free:
+            self.created += 1
+            return Packet(src_id, dst_id, size_bytes, kind, seq, t_created, next_hop_id, origin_id, hops)
+        self.reused += 1
+        p = self.free.pop()
+        p.src_id = src_id
+        p.dst_id = dst_id
+        p.size_bytes = size_bytes
+        p.kind = kind
+        p.seq = seq
+        p.t_created = t_created
+        p.next_hop_id = next_hop_id or dst_id
+        p.origin_id = origin_id or src_id
+        p.hops = hops
+        return p
+
+    def release(self, p: Packet):
+        if len(self.free) < self.limit:
+            self.free.append(p)
+
+@dataclass(slots=True)
 class NodeMac:
     """
     Single Node MAC with queue, contention window, backoff, retry count, and ack handling
@@ -73,6 +162,22 @@ class MacMetrics:
     rtt_ms_total: float = 0.0
     rtt_samples: int = 0
     pdr: float = 0.0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)                         # all delivered packets
+    latency_by_flow: Dict[Tuple[int, int], LatencyHistogram] = field(default_factory=dict)      # (origin, dst) -> histogram
+    latency_by_phy: Dict[str, LatencyHistogram] = field(default_factory=dict)                   # packet kind -> histogram
+
+    def record_latency(self, origin: int, dst: int, kind: str, ms: float):
+        self.rtt_samples += 1
+        self.rtt_ms_total += ms
+        self.latency.record(ms)
+        flow = self.latency_by_flow.get((origin, dst))
+        if flow is None:                                            # first packet of a flow
+            flow = self.latency_by_flow[(origin, dst)] = LatencyHistogram()
+        flow.record(ms)
+        phy = self.latency_by_phy.get(kind)
+        if phy is None:
+            phy = self.latency_by_phy[kind] = LatencyHistogram()
+        phy.record(ms)
 
     def view(self):
         return { 
@@ -87,29 +192,69 @@ class MacMetrics:
         "rtt_ms_total": self.rtt_ms_total,
         "rtt_samples": self.rtt_samples,
         "pdr": self.pdr,
-        "avg_rtt": (self.rtt_ms_total / self.rtt_samples) if self.rtt_samples else None
+        "avg_rtt": (self.rtt_ms_total / self.rtt_samples) if self.rtt_samples else None,
+        **{f"rtt_p{p}": v for p, v in self.latency.percentiles((50, 95, 99)).items()},
         }
 
 class Mac:
     """"
     Main MAC engine
     """
-    def __init__(self, seed: int = 123, cfg: Optional[MacConfig] = None, range_checker=None, forward_callback=None, tx_start_callback=None):
+    def __init__(self, seed: int = 123, cfg: Optional[MacConfig] = None, range_checker=None, forward_callback=None, tx_start_callback=None, wake_callback=None, interference_callback=None):
         self.cfg = cfg or MacConfig()                               # initializer 
         self.rng = random.Random(seed)
         self.channel = Channel()
         self.nodes: Dict[int, NodeMac] = {}
+        self.active: Dict[int, NodeMac] = {}  # nodes with queued packets, in registration order
+        self._order: Dict[int, int] = {}      # node_id -> registration index (contention order)
+        self._resort = False
         self.metrics = MacMetrics()
-        self.seen: Set[Tuple[int, int, int]] = set()
+        self.seen = ReplayWindow(self.cfg.dedup_window)  # delivered (src, dst, seq), per flow
+        self.pool = PacketPool()  # used when cfg.packet_pool is on
         self.slot_index = 0
+        self.backlog = 0  # packets queued across all nodes
         self.range_checker = range_checker  # Callback to check if nodes are in range
         self.forward_callback = forward_callback  # Callback to forward packets at intermediate nodes
         self.tx_start_callback = tx_start_callback  # Callback when transmission starts
+        self.wake_callback = wake_callback  # Callback when a node starts contending (before it joins the active set)
+        self.interference_callback = interference_callback  # Callback giving the node ids within interference range (spatial channel)
 
     def add_node(self, node_id: int, kind: MacKind = "WiFi"):
         if node_id in self.nodes: return                            # reguster node with empty TxQueue
         q = TxQueue(self.cfg.queue_capacity)
         self.nodes[node_id] = NodeMac(node_id=node_id, kind=kind, queue=q)
+        self._order[node_id] = len(self._order)
+
+    def _activate(self, st: NodeMac):
+        active = self.active
+        if active and self._order[st.node_id] < self._order[next(reversed(active))]:
+            self._resort = True                                     # keep contention in registration order
+        active[st.node_id] = st
+
+    def _deactivate(self, st: NodeMac):
+        if not st.queue.q:
+            del self.active[st.node_id]
+
+    def idle_slots(self) -> int:
+        """Slots until someone transmits if the channel stays idle (every contender only counts down)"""
+        return min(st.backoff for st in self.active.values()) if self.active else 0
+
+    def countdown(self, slots: int):
+        """Fast-forward `slots` idle slots: equivalent to that many ticks in which nobody transmits"""
+        if slots > 0:
+            for st in self.active.values():
+                st.backoff -= slots
+
+    def new_packet(self, src_id: int, dst_id: int, size_bytes: int, kind: str, seq: int = 0,
+                   t_created: float = 0.0, next_hop_id: int = 0, origin_id: int = 0, hops: int = 0) -> Packet:
+        """A Packet for enqueue(), recycled from the free-list if packet pooling is on"""
+        if self.cfg.packet_pool:
+            return self.pool.acquire(src_id, dst_id, size_bytes, kind, seq, t_created, next_hop_id, origin_id, hops)
+        return Packet(src_id, dst_id, size_bytes, kind, seq, t_created, next_hop_id, origin_id, hops)
+
+    def _recycle(self, pkt: Packet):
+        if self.cfg.packet_pool:
+            self.pool.release(pkt)
 
     def enqueue(self, pkt: Packet) -> bool:
         st = self.nodes[pkt.src_id]                                 # push packet to source node's TxQueue
@@ -119,31 +264,75 @@ class Mac:
             if st.cw == 0:
                 st.cw = self.cfg.cw_min
                 st.backoff = self.rng.randrange(st.cw)
+            self.backlog += 1
+            if len(st.queue.q) == 1:                                # node starts contending
+                if self.wake_callback:
+                    self.wake_callback()
+                self._activate(st)
             return True
         else:
             self.metrics.queue_drops += 1
+            self._recycle(pkt)
             return False
+
+    def enqueue_many(self, src_id: int, dst_id: int, count: int, size_bytes: int, kind: str,
+                     seq: int, t_created: float, next_hop_id: int) -> int:
+        """
+        Bulk enqueue() of `count` packets of one flow (sequence numbers seq, seq+1, ...):
+        same queue, metric and backoff effects, one TxQueue extend. Returns how many fit.
+        """
+        st = self.nodes[src_id]
+        q = st.queue
+        accepted = max(0, min(count, q.capacity - len(q.q)))
+        dropped = count - accepted
+        if dropped:
+            q.drops += dropped
+            self.metrics.queue_drops += dropped
+        if not accepted:
+            return 0
+        was_idle = not q.q
+        if self.cfg.packet_pool:
+            new = self.pool.acquire
+            q.q.extend(new(src_id, dst_id, size_bytes, kind, s, t_created, next_hop_id, src_id) for s in range(seq, seq + accepted))
+        else:
+            q.q.extend(Packet(src_id, dst_id, size_bytes, kind, s, t_created, next_hop_id, src_id) for s in range(seq, seq + accepted))
+        self.metrics.enqueued += accepted
+        if st.cw == 0:
+            st.cw = self.cfg.cw_min
+            st.backoff = self.rng.randrange(st.cw)
+        self.backlog += accepted
+        if was_idle:                                                # node starts contending
+            if self.wake_callback:
+                self.wake_callback()
+            self._activate(st)
+        return accepted
         
     def tick(self):
         self.slot_index += 1                                        # move to next slot and advance channel state
-        self.channel.clear()
+        channel = self.channel
+        channel.clear()
+        spatial = self.cfg.channel == "spatial" and self.interference_callback is not None
+        channel.neighbors = self.interference_callback if spatial else None
+        if self._resort:
+            self.active = dict(sorted(self.active.items(), key=lambda kv: self._order[kv[0]]))
+            self._resort = False
 
-        for st in self.nodes.values():
-            if st.awaiting_ack is not None:                         # CSMA/CA per node
+        for st in self.active.values():                             # CSMA/CA per node with queued packets
+            if st.awaiting_ack is not None:
                 continue
-            head = st.queue.peek()
-            if not head: continue
-
-            if self.channel.is_busy():
+            if spatial and channel.is_busy(st.node_id):             # a transmitter in range: backoff frozen
                 continue
             if st.backoff > 0:
                 st.backoff -= 1
                 continue
-            self.channel.start_tx(st.node_id, head)
+            head = st.queue.peek()
+            channel.start_tx(st.node_id, head)
             st.awaiting_ack = head
+            if not spatial:
+                break                                               # channel busy: later nodes neither send nor count down
 
-        collision, tx_nodes = self.channel.end_slot()
-        if collision: self.metrics.collisions += 1
+        collided, tx_nodes = channel.end_slot()
+        self.metrics.collisions += len(collided)
 
         for nid in tx_nodes:                                        # resolve slot
             st = self.nodes[nid]
@@ -156,13 +345,16 @@ class Mac:
                 out_of_range = not self.range_checker(pkt.src_id, pkt.next_hop_id)
             
             rand_loss = self.rng.random() < self.cfg.base_loss_prob
-            failed = (collision and self.cfg.collision_losses) or rand_loss or out_of_range
+            failed = (nid in collided and self.cfg.collision_losses) or rand_loss or out_of_range
 
             if failed:
                 st.retry_count += 1
                 self.metrics.retries += 1                           # increment/reset failure metrics
                 if st.retry_count > self.cfg.retry_limit:
                     st.queue.pop()
+                    self.backlog -= 1
+                    self._deactivate(st)
+                    self._recycle(pkt)
                     self.metrics.dequeued_fail += 1
                     st.retry_count = 0
                     st.cw = self.cfg.cw_min
@@ -180,12 +372,10 @@ class Mac:
         # Check if packet reached final destination or needs forwarding
         if pkt.next_hop_id == pkt.dst_id:
             # Reached final destination - check for duplicates
-            key = (pkt.src_id, pkt.dst_id, pkt.seq)
-            duplicate = key in self.seen
+            duplicate = self.seen.check(pkt.src_id, pkt.dst_id, pkt.seq)
             if duplicate:
                 self.metrics.duplicates += 1
             else:
-                self.seen.add(key)
                 self.metrics.dequeued_ok += 1
                 self.metrics.bytes_ok += pkt.size_bytes
                 now_ms = self.slot_index * self.cfg.slot_ms
@@ -195,13 +385,15 @@ class Mac:
                 data_rate_bps = PHY_PROFILES.get(pkt.kind, {}).get("data_rate", 54_000)
                 tx_time_ms = (pkt.size_bytes * 8 / data_rate_bps) * 1000
                 
-                self.metrics.rtt_samples += 1
-                self.metrics.rtt_ms_total += max(0.0, now_ms - pkt.t_created * 1000.0 + tx_time_ms)
+                self.metrics.record_latency(pkt.origin_id, pkt.dst_id, pkt.kind, max(0.0, now_ms - pkt.t_created * 1000.0 + tx_time_ms))
         elif self.forward_callback:
             # Intermediate hop - forward packet (not a duplicate, just forwarding)
             self.forward_callback(pkt)
         
         st.queue.pop()                                              # dequeue packet and reset backoff state
+        self.backlog -= 1
+        self._deactivate(st)
+        self._recycle(pkt)                                          # forwarding made a new hop packet; this one is done
         st.retry_count = 0
         st.cw = self.cfg.cw_min
         st.backoff = self.rng.randrange(st.cw)
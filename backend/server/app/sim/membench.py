@@ -0,0 +1,53 @@
+"""
+Memory benchmark
+- Bytes per node (Store.add_node: node record, MAC state, routing table, spatial index)
+- Bytes per in-flight packet (a queued Packet)
+Run from backend/server:  python -m app.sim.membench [sizes...] [--array-backed]
+"""
+from __future__ import annotations
+import gc
+import random
+import sys
+import tracemalloc
+from typing import List
+
+from .store import Store
+
+def measure(n: int, array_backed: bool = False, packets_per_node: int = 4, seed: int = 1) -> dict:
+    rnd = random.Random(seed)
+    side = (n ** 0.5) * 20  # keeps the density (and so per-node link count) constant across sizes
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    store = Store(array_backed=array_backed, seed=seed)
+    for _ in range(n):
+        store.add_node("sensor", "WiFi", rnd.uniform(0, side), rnd.uniform(0, side), sleep_ratio=0.0)
+    gc.collect()
+    after_nodes = tracemalloc.get_traced_memory()[0]
+
+    mac = store.mac
+    ids = [node.id for node in store.nodes]
+    queued = 0
+    for k in range(packets_per_node):
+        for nid in ids:
+            queued += mac.enqueue(mac.new_packet(nid, ids[(k + 1) % n], 100, "WiFi", seq=queued + 1))
+    gc.collect()
+    after_packets = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {
+        "nodes": n,
+        "bytes_per_node": (after_nodes - base) / n,
+        "packets": queued,
+        "bytes_per_packet": (after_packets - after_nodes) / queued if queued else 0.0,
+    }
+
+def main(argv: List[str]):
+    array_backed = "--array-backed" in argv
+    sizes = [int(a) for a in argv if not a.startswith("--")] or [1_000, 10_000, 100_000]
+    print(f"{'nodes':>8} {'bytes/node':>12} {'bytes/packet':>13}  ({'array-backed' if array_backed else 'object'} nodes)")
+    for n in sizes:
+        r = measure(n, array_backed)
+        print(f"{r['nodes']:>8} {r['bytes_per_node']:>12.0f} {r['bytes_per_packet']:>13.0f}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -2,7 +2,12 @@ from __future__ import annotations
 import random
 import math
 from dataclasses import dataclass
-from typing import Tuple
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for BatchMobility
+    np = None
 
 @dataclass
 class Waypoint:
@@ -20,6 +25,10 @@ class MobilityModel:
     def update_position(self, current_x: float, current_y: float, dt: float, bounds: Tuple[float, float, float, float]) -> Tuple[float, float]:
         """Update position based on mobility model. Returns (new_x, new_y)"""
         return current_x, current_y
+    
+    def next_move_in(self) -> Optional[float]:
+        """Seconds until the node next moves (0 = moving now, None = never)"""
+        return None
 
 class RandomWaypointMobility(MobilityModel):
     """Random Waypoint mobility model"""
@@ -34,6 +43,9 @@ class RandomWaypointMobility(MobilityModel):
         self.center_x = center_x  # Center point X
         self.center_y = center_y  # Center point Y
     
+    def next_move_in(self) -> Optional[float]:
+        return max(0.0, self.pause_remaining)
+    
     def update_position(self, current_x: float, current_y: float, dt: float, bounds: Tuple[float, float, float, float]) -> Tuple[float, float]:
         """
         Random Waypoint: Move to random waypoint, pause, pick new waypoint
@@ -97,6 +109,9 @@ class GridMobility(MobilityModel):
         self.direction = random.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])  # Right, Left, Down, Up
         self.rng = random.Random(node_id)
     
+    def next_move_in(self) -> Optional[float]:
+        return 0.0
+    
     def update_position(self, current_x: float, current_y: float, dt: float, bounds: Tuple[float, float, float, float]) -> Tuple[float, float]:
         """
         Grid mobility: Move in current direction, change direction at grid intersections
@@ -124,3 +139,231 @@ class GridMobility(MobilityModel):
                 self.direction = self.rng.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
         
         return new_x, new_y
+
+
+class BatchMobility:
+    """
+    Vectorized mobility for all mobile nodes at once.
+    Waypoints, speeds, pause timers, bounded-radius centers and grid directions live in
+    NumPy arrays and every node advances in one step. Random draws come from one seeded
+    NumPy generator (rng_mode="numpy") or from each node's own random.Random
+    (rng_mode="per_node", same sequence as the per-node models).
+    """
+    RWP, GRID = 0, 1
+    _FLOAT = ("speed", "last", "pause_time", "pause_remaining", "wp_x", "wp_y",
+              "radius", "center_x", "center_y", "dir_x", "dir_y", "grid_size")
+    _DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+
+    def __init__(self, seed: int = 123, rng_mode: str = "numpy", capacity: int = 64):
+        if np is None:
+            raise RuntimeError("batch mobility requires numpy")
+        if rng_mode not in ("numpy", "per_node"):
+            raise ValueError(f"unknown rng_mode {rng_mode!r}")
+        self.rng_mode = rng_mode
+        self.gen = np.random.default_rng(seed)
+        self.size = 0
+        self.index: Dict[int, int] = {}          # node_id -> row
+        self.rngs: List[random.Random] = []       # per-node RNGs (per_node mode)
+        self.node_id = np.zeros(capacity, dtype=np.int64)
+        self.slot = np.full(capacity, -1, dtype=np.int64)  # NodeArrays slot of the node (-1 = dataclass node)
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        self.has_wp = np.zeros(capacity, dtype=bool)
+        self.bounded = np.zeros(capacity, dtype=bool)
+        for name in self._FLOAT:
+            setattr(self, name, np.zeros(capacity))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _columns(self) -> List[str]:
+        return ["node_id", "slot", "kind", "has_wp", "bounded", *self._FLOAT]
+
+    def add(self, model: MobilityModel, now: float, slot: int = -1):
+        """Adopt a per-node model's parameters (and RNG, for per_node mode)"""
+        if model.node_id in self.index:
+            return
+        if self.size == len(self.node_id):
+            for name in self._columns():
+                old = getattr(self, name)
+                col = np.zeros(len(old) * 2, dtype=old.dtype)
+                col[:len(old)] = old
+                setattr(self, name, col)
+        i = self.size
+        self.size += 1
+        self.index[model.node_id] = i
+        self.rngs.append(getattr(model, "rng", None) or random.Random(model.node_id))
+        self.node_id[i] = model.node_id
+        self.slot[i] = slot
+        self.speed[i] = model.speed
+        self.last[i] = now
+        self.has_wp[i] = False
+        self.pause_remaining[i] = 0.0
+        if isinstance(model, GridMobility):
+            self.kind[i] = self.GRID
+            self.dir_x[i], self.dir_y[i] = model.direction
+            self.grid_size[i] = model.grid_size
+        else:
+            self.kind[i] = self.RWP
+            self.pause_time[i] = getattr(model, "pause_time", 0.0)
+            self.pause_remaining[i] = getattr(model, "pause_remaining", 0.0)
+            wp = getattr(model, "waypoint", None)
+            if wp is not None:
+                self.has_wp[i] = True
+                self.wp_x[i], self.wp_y[i] = wp.x, wp.y
+            radius = getattr(model, "max_radius", None)
+            cx, cy = getattr(model, "center_x", None), getattr(model, "center_y", None)
+            self.bounded[i] = bool(radius) and cx is not None and cy is not None
+            if self.bounded[i]:
+                self.radius[i], self.center_x[i], self.center_y[i] = radius, cx, cy
+
+    def remove(self, node_id: int):
+        """Swap-remove a node's row"""
+        i = self.index.pop(node_id, None)
+        if i is None:
+            return
+        last = self.size - 1
+        if i != last:
+            for name in self._columns():
+                col = getattr(self, name)
+                col[i] = col[last]
+            self.rngs[i] = self.rngs[last]
+            self.index[int(self.node_id[i])] = i
+        self.rngs.pop()
+        self.size = last
+
+    def next_move_in(self) -> Optional[float]:
+        """Seconds until some node next moves (0 = moving now, None = no mobile nodes)"""
+        n = self.size
+        if n == 0:
+            return None
+        if (self.kind[:n] == self.GRID).any():
+            return 0.0
+        return max(0.0, float(self.pause_remaining[:n].min()))
+
+    def step(self, now: float, x, y, bounds: Tuple[float, float, float, float]):
+        """
+        Advance every row to sim time `now`. x, y are the current positions (arrays, row order)
+        and are updated in place. Returns a bool mask of rows whose position changed.
+        """
+        n = self.size
+        dt = now - self.last[:n]
+        self.last[:n] = now
+        moved = np.zeros(n, dtype=bool)
+        live = dt > 0
+        rwp = live & (self.kind[:n] == self.RWP)
+        if rwp.any():
+            self._step_rwp(np.flatnonzero(rwp), dt, x, y, bounds, moved)
+        grid = live & (self.kind[:n] == self.GRID)
+        if grid.any():
+            self._step_grid(np.flatnonzero(grid), dt, x, y, bounds, moved)
+        return moved
+
+    def _step_rwp(self, rows, dt, x, y, bounds, moved):
+        min_x, min_y, max_x, max_y = bounds
+        dt = dt[rows]
+        paused = self.pause_remaining[rows] > 0
+        # If paused, wait
+        self.pause_remaining[rows[paused]] -= dt[paused]
+        rows, dt = rows[~paused], dt[~paused]
+        if len(rows) == 0:
+            return
+        # If no waypoint, pick one
+        need = rows[~self.has_wp[rows]]
+        if len(need):
+            self._draw_waypoints(need, bounds)
+        # Move towards waypoint
+        ox, oy = x[rows], y[rows]
+        dx = self.wp_x[rows] - ox
+        dy = self.wp_y[rows] - oy
+        distance = np.sqrt(dx**2 + dy**2)
+        step = self.speed[rows] * dt
+        arrived = distance < step
+        with np.errstate(divide="ignore", invalid="ignore"):
+            nx = np.where(arrived, self.wp_x[rows], ox + dx / distance * self.speed[rows] * dt)
+            ny = np.where(arrived, self.wp_y[rows], oy + dy / distance * self.speed[rows] * dt)
+        done = rows[arrived]
+        self.has_wp[done] = False
+        self.pause_remaining[done] = self.pause_time[done]
+        # Keep within bounds
+        nx = np.clip(nx, min_x, max_x)
+        ny = np.clip(ny, min_y, max_y)
+        moved[rows] = (nx != ox) | (ny != oy)
+        x[rows] = nx
+        y[rows] = ny
+
+    def _draw_waypoints(self, rows, bounds):
+        min_x, min_y, max_x, max_y = bounds
+        if self.rng_mode == "per_node":
+            for i in rows:
+                rng = self.rngs[i]
+                if self.bounded[i]:
+                    angle = rng.uniform(0, 2 * math.pi)
+                    distance = rng.uniform(0, self.radius[i])
+                    wx = self.center_x[i] + distance * math.cos(angle)
+                    wy = self.center_y[i] + distance * math.sin(angle)
+                    self.wp_x[i] = max(min_x, min(max_x, wx))
+                    self.wp_y[i] = max(min_y, min(max_y, wy))
+                else:
+                    self.wp_x[i] = rng.uniform(min_x, max_x)
+                    self.wp_y[i] = rng.uniform(min_y, max_y)
+        else:
+            k = len(rows)
+            bounded = self.bounded[rows]
+            angle = self.gen.uniform(0, 2 * math.pi, k)
+            distance = self.gen.uniform(0, 1, k) * self.radius[rows]
+            wx = np.where(bounded, self.center_x[rows] + distance * np.cos(angle), self.gen.uniform(min_x, max_x, k))
+            wy = np.where(bounded, self.center_y[rows] + distance * np.sin(angle), self.gen.uniform(min_y, max_y, k))
+            self.wp_x[rows] = np.clip(wx, min_x, max_x)
+            self.wp_y[rows] = np.clip(wy, min_y, max_y)
+        self.has_wp[rows] = True
+
+    def _step_grid(self, rows, dt, x, y, bounds, moved):
+        min_x, min_y, max_x, max_y = bounds
+        dt = dt[rows]
+        step = self.speed[rows] * dt
+        # Move in current direction
+        nx = x[rows] + self.dir_x[rows] * step
+        ny = y[rows] + self.dir_y[rows] * step
+        hit_x = (nx <= min_x) | (nx >= max_x)
+        hit_y = (ny <= min_y) | (ny >= max_y)
+        nx = np.clip(nx, min_x, max_x)
+        ny = np.clip(ny, min_y, max_y)
+        g = self.grid_size[rows]
+        at_cross = (np.abs(nx % g) < step) | (np.abs(ny % g) < step)
+        turning = hit_x | hit_y | at_cross
+        if turning.any():
+            if self.rng_mode == "per_node":
+                for j in np.flatnonzero(turning):
+                    self._turn_per_node(rows[j], bool(hit_x[j]), bool(hit_y[j]), bool(at_cross[j]))
+            else:
+                self._turn_vectorized(rows[turning], hit_x[turning], hit_y[turning], at_cross[turning])
+        moved[rows] = (nx != x[rows]) | (ny != y[rows])
+        x[rows] = nx
+        y[rows] = ny
+
+    def _turn_per_node(self, i: int, hit_x: bool, hit_y: bool, at_cross: bool):
+        """Same draws, in the same order, as GridMobility.update_position"""
+        rng = self.rngs[i]
+        d = (int(self.dir_x[i]), int(self.dir_y[i]))
+        if hit_x:
+            d = (rng.choice([-1, 1]) if d[0] == 0 else 0, rng.choice([-1, 1]) if d[1] == 0 else 0)
+        if hit_y:
+            d = (rng.choice([-1, 1]) if d[0] == 0 else 0, rng.choice([-1, 1]) if d[1] == 0 else 0)
+        if at_cross and rng.random() < 0.1:
+            d = rng.choice(self._DIRECTIONS)
+        self.dir_x[i], self.dir_y[i] = d
+
+    def _turn_vectorized(self, rows, hit_x, hit_y, at_cross):
+        for hit in (hit_x, hit_y):
+            r = rows[hit]
+            if len(r):
+                sign = self.gen.choice([-1.0, 1.0], size=(len(r), 2))
+                dx, dy = self.dir_x[r], self.dir_y[r]
+                self.dir_x[r] = np.where(dx == 0, sign[:, 0], 0.0)
+                self.dir_y[r] = np.where(dy == 0, sign[:, 1], 0.0)
+        r = rows[at_cross]
+        if len(r):
+            r = r[self.gen.random(len(r)) < 0.1]
+            picks = np.array(self._DIRECTIONS, dtype=float)[self.gen.integers(0, 4, len(r))]
+            self.dir_x[r] = picks[:, 0]
+            self.dir_y[r] = picks[:, 1]
@@ -1,11 +1,11 @@
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import Literal, Set, List, Dict
+from typing import Any, Literal, Set, List, Dict, Optional
 
 Role = Literal["sensor", "subscriber", "mobile", "broker", "publisher"]
 PHYType = Literal["WiFi", "BLE"]
 
-@dataclass
+@dataclass(slots=True)
 class Position:
     x: float
     y: float
@@ -32,7 +32,7 @@ class DeliveryLog:
     dup: bool
     success: bool
 
-@dataclass
+@dataclass(slots=True)
 class Node:
     id: int
     role: Role
@@ -58,6 +58,45 @@ class NodeCreate(BaseModel):
     speed: float = 0.0
     sleepRatio: float = 0.2
 
+class SessionCreate(BaseModel):
+    cpuBudgetMs: Optional[float] = Field(default=None, gt=0)
+    arrayBacked: bool = False
+    batchMobility: bool = False
+    seed: int = 123
+    routing: Literal["dv", "jacobi", "oracle"] = "dv"  # jacobi needs routeTables "array"
+    routeTables: Literal["dict", "array"] = "dict"
+    channel: Literal["global", "spatial"] = "global"
+
+class TrafficFlow(BaseModel):
+    src: int
+    dst: int
+    n: int = Field(default=1, ge=0)
+    size: int = Field(default=100, gt=0)
+    kind: str = "WiFi"
+
+class TrafficBatch(BaseModel):
+    flows: List[TrafficFlow] = Field(min_length=1)
+
+class TrafficSourceCreate(BaseModel):
+    kind: Literal["cbr", "poisson", "onoff"]
+    node: int
+    rate: float = Field(gt=0)  # packets per second (while on, for onoff)
+    dsts: List[int] = []  # empty = any other node
+    pick: Literal["random", "round_robin"] = "random"
+    size: int = Field(default=100, gt=0)
+    start: Optional[float] = None  # sim time (default: now)
+    stop: Optional[float] = None
+    count: Optional[int] = Field(default=None, ge=1)
+    onMean: float = Field(default=1.0, gt=0)  # onoff: mean burst / silence durations (s)
+    offMean: float = Field(default=1.0, gt=0)
+    animate: bool = False
+
+class SweepRequest(BaseModel):
+    points: List[Dict[str, Any]] = Field(min_length=1)  # parameter sets (phy, sleep_ratio, nodes, spacing, routing, route_tables, packets, size, warmup, duration, mac)
+    replications: int = Field(default=3, ge=1)
+    seed: int = 123  # first seed; replications use seed, seed+1, ...
+    seeds: Optional[List[int]] = None  # explicit seeds (overrides replications/seed)
+
 class NodeView(BaseModel):
     id: int
     role: Role
@@ -79,6 +118,9 @@ class MetricsView(BaseModel):
     duplicates: int
     avgEnergy: float
     totalAwakeTime: float
+    p50LatencyMs: float = 0.0
+    p95LatencyMs: float = 0.0
+    p99LatencyMs: float = 0.0
 
 class RouteEntryView(BaseModel):
     dest: int
@@ -1,10 +1,9 @@
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import Dict, Set, List, Optional
-from collections import defaultdict
+from typing import Dict, Iterator, Set, List, Optional
 import time
 
-@dataclass
+@dataclass(slots=True)
 class MqttMessage:
     """MQTT message with QoS support"""
     topic: str
@@ -23,7 +22,7 @@ class Subscription:
     topic: str
     qos: int
 
-@dataclass
+@dataclass(slots=True)
 class PendingAck:
     """Pending acknowledgment for QoS 1 messages"""
     msg_id: int
@@ -32,13 +31,141 @@ class PendingAck:
     retry_count: int = 0
     last_sent: float = field(default_factory=time.time)
 
+def validate_filter(topic_filter: str):
+    """MQTT filter rules: '+' fills a whole level, '#' is a whole level and the last one"""
+    levels = topic_filter.split("/")
+    for i, level in enumerate(levels):
+        if ("+" in level and level != "+") or ("#" in level and (level != "#" or i != len(levels) - 1)):
+            raise ValueError(f"invalid topic filter {topic_filter!r}")
+
+class TopicLevel:
+    """One trie node: a topic level, the subscriptions whose filter ends here and the retained message"""
+    __slots__ = ("children", "subs", "retained")
+
+    def __init__(self):
+        self.children: Dict[str, TopicLevel] = {}
+        self.subs: Optional[Dict[int, int]] = None      # client_id -> qos
+        self.retained: Optional[MqttMessage] = None
+
+class TopicTrie:
+    """
+    Topic-level trie for subscriptions (filters with + and #) and retained messages (topic names).
+    Matching walks the topic's levels, so its cost depends on topic depth and on how many
+    wildcard branches exist along the way, not on the total number of subscriptions.
+    Wildcards at the first level do not match topics starting with '$' (as in MQTT).
+    """
+    def __init__(self):
+        self.root = TopicLevel()
+
+    def _node(self, topic: str) -> TopicLevel:
+        node = self.root
+        for level in topic.split("/"):
+            child = node.children.get(level)
+            if child is None:
+                child = node.children[level] = TopicLevel()
+            node = child
+        return node
+
+    def add(self, topic_filter: str, subs: Dict[int, int]):
+        """Index the subscriber dict of a filter (shared with the broker's subscriptions map)"""
+        self._node(topic_filter).subs = subs
+
+    def discard(self, topic_filter: str):
+        """Drop a filter and prune the levels nothing hangs off anymore"""
+        path = [self.root]
+        levels = topic_filter.split("/")
+        for level in levels:
+            child = path[-1].children.get(level)
+            if child is None:
+                return
+            path.append(child)
+        path[-1].subs = None
+        for i in range(len(levels), 0, -1):
+            node = path[i]
+            if node.children or node.subs or node.retained is not None:
+                break
+            del path[i - 1].children[levels[i - 1]]
+
+    def match(self, topic: str) -> Dict[int, int]:
+        """Subscribers of every filter matching topic; a client matched twice gets its highest QoS"""
+        levels = topic.split("/")
+        n = len(levels)
+        out: Dict[int, int] = {}
+        stack = [(self.root, 0)]
+        while stack:
+            node, i = stack.pop()
+            children = node.children
+            wild = i > 0 or not topic.startswith("$")
+            if wild:
+                multi = children.get("#")  # matches the rest, including nothing ("a/#" matches "a")
+                if multi is not None and multi.subs:
+                    self._merge(out, multi.subs)
+            if i == n:
+                if node.subs:
+                    self._merge(out, node.subs)
+                continue
+            child = children.get(levels[i])
+            if child is not None:
+                stack.append((child, i + 1))
+            if wild:
+                single = children.get("+")
+                if single is not None:
+                    stack.append((single, i + 1))
+        return out
+
+    @staticmethod
+    def _merge(out: Dict[int, int], subs: Dict[int, int]):
+        for client_id, qos in subs.items():
+            if qos > out.get(client_id, -1):
+                out[client_id] = qos
+
+    def set_retained(self, message: MqttMessage):
+        self._node(message.topic).retained = message
+
+    def retained(self, topic_filter: str) -> List[MqttMessage]:
+        """Retained messages whose topic matches the filter"""
+        levels = topic_filter.split("/")
+        n = len(levels)
+        out: List[MqttMessage] = []
+        stack = [(self.root, 0)]
+        while stack:
+            node, i = stack.pop()
+            if i == n:
+                if node.retained is not None:
+                    out.append(node.retained)
+                continue
+            level = levels[i]
+            if level == "#":
+                out.extend(self._subtree(node, skip_sys=(i == 0)))
+            elif level == "+":
+                for name, child in node.children.items():
+                    if not (i == 0 and name.startswith("$")):
+                        stack.append((child, i + 1))
+            else:
+                child = node.children.get(level)
+                if child is not None:
+                    stack.append((child, i + 1))
+        return out
+
+    @staticmethod
+    def _subtree(node: TopicLevel, skip_sys: bool) -> Iterator[MqttMessage]:
+        if node.retained is not None and not skip_sys:
+            yield node.retained
+        stack = [child for name, child in node.children.items() if not (skip_sys and name.startswith("$"))]
+        while stack:
+            node = stack.pop()
+            if node.retained is not None:
+                yield node.retained
+            stack.extend(node.children.values())
+
 class MqttBroker:
     """MQTT Broker implementation"""
     
     def __init__(self, broker_id: int):
         self.broker_id = broker_id
-        self.subscriptions: Dict[str, Dict[int, int]] = defaultdict(dict)  # topic -> {client_id: qos}
+        self.subscriptions: Dict[str, Dict[int, int]] = {}  # topic filter -> {client_id: qos}
         self.retained_messages: Dict[str, MqttMessage] = {}  # topic -> last retained message
+        self.topics = TopicTrie()  # indexes subscriptions and retained messages by topic level
         self.pending_acks: Dict[tuple, PendingAck] = {}  # (msg_id, subscriber_id) -> PendingAck
         self.message_queue: List[MqttMessage] = []  # Broker's message queue
         self.next_msg_id = 1
@@ -55,18 +182,35 @@ class MqttBroker:
         }
     
     def subscribe(self, client_id: int, topic: str, qos: int = 0):
-        """Client subscribes to a topic"""
-        self.subscriptions[topic][client_id] = qos  # Store QoS level
+        """Client subscribes to a topic filter (may contain + and # wildcards)"""
+        validate_filter(topic)
+        subs = self.subscriptions.get(topic)
+        if subs is None:
+            subs = self.subscriptions[topic] = {}
+            self.topics.add(topic, subs)
+        subs[client_id] = qos  # Store QoS level
         
-        # Send retained message if exists
-        if topic in self.retained_messages:
-            return [self.retained_messages[topic]]
-        return []
+        # Send retained messages matching the filter
+        return self.topics.retained(topic)
     
     def unsubscribe(self, client_id: int, topic: str):
-        """Client unsubscribes from a topic"""
-        if topic in self.subscriptions and client_id in self.subscriptions[topic]:
-            del self.subscriptions[topic][client_id]
+        """Client unsubscribes from a topic filter"""
+        subs = self.subscriptions.get(topic)
+        if subs is not None and client_id in subs:
+            del subs[client_id]
+            if not subs:
+                del self.subscriptions[topic]
+                self.topics.discard(topic)
+    
+    def subscribers(self, topic: str) -> Dict[int, int]:
+        """client_id -> effective subscription QoS for a published topic"""
+        return self.topics.match(topic)
+    
+    def clear_topics(self):
+        """Drop all subscriptions and retained messages"""
+        self.subscriptions.clear()
+        self.retained_messages.clear()
+        self.topics = TopicTrie()
     
     def publish(self, message: MqttMessage) -> tuple[List[tuple], bool]:
         """
@@ -80,9 +224,10 @@ class MqttBroker:
         # Handle retained messages
         if message.retained:
             self.retained_messages[message.topic] = message
+            self.topics.set_retained(message)
         
-        # Find subscribers for this topic
-        subscribers = self.subscriptions.get(message.topic, {})
+        # Find subscribers of every filter matching this topic
+        subscribers = self.topics.match(message.topic)
         deliveries = []
         
         for sub_id, sub_qos in subscribers.items():
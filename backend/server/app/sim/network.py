@@ -1,15 +1,21 @@
 """
 Minimal Network Layer Implementation
 - Distance-vector routing (hop count metric)
-- Periodic route advertisements
+- Incremental advertisements: only routes changed since a node's last ad
+- Triggered updates right after a change, periodic full refreshes
+- Broken routes are withdrawn (advertised with an infinite metric), poisoned reverse,
+  and held down until the next round so stale offers can't close a loop
 - Next-hop forwarding
+- Optional oracle mode: next hops straight from the adjacency graph (BFS), no convergence
 """
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import Dict, Optional, Set, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 import math
 
-@dataclass
+INFINITY = 64  # unreachable metric: advertised to withdraw a route, also bounds counting to infinity
+
+@dataclass(slots=True)
 class RouteEntry:
     """Single routing table entry"""
     dest: int           # Destination node ID
@@ -17,42 +23,225 @@ class RouteEntry:
     metric: int         # Hop count to destination
     seq: int = 0        # Sequence number (freshness)
     
-@dataclass
+@dataclass(slots=True)
 class RoutingTable:
-    """Node's routing table"""
+    """Node's routing table (mutate routes through its methods so the reverse index stays in sync)"""
     node_id: int
     routes: Dict[int, RouteEntry] = field(default_factory=dict)
+    via: Dict[int, Set[int]] = field(default_factory=dict)  # next_hop -> dests routed through it
+    users: Optional[Dict[int, Set[int]]] = field(default=None, repr=False)  # shared next_hop -> owner ids
     
     def get_next_hop(self, dest: int) -> Optional[int]:
         """Get next hop for destination, None if no route"""
         entry = self.routes.get(dest)
         return entry.next_hop if entry else None
     
+    def _set(self, dest: int, next_hop: int, metric: int, seq: int, existing: Optional[RouteEntry]):
+        if existing is None or existing.next_hop != next_hop:
+            if existing is not None:
+                self._unlink(existing.next_hop, dest)
+            dests = self.via.get(next_hop)
+            if dests is None:
+                dests = self.via[next_hop] = set()
+                if self.users is not None:
+                    self.users.setdefault(next_hop, set()).add(self.node_id)
+            dests.add(dest)
+        self.routes[dest] = RouteEntry(dest, next_hop, metric, seq)
+    
+    def _unlink(self, next_hop: int, dest: int):
+        dests = self.via.get(next_hop)
+        if dests is None:
+            return
+        dests.discard(dest)
+        if not dests:
+            del self.via[next_hop]
+            self._drop_user(next_hop)
+    
+    def _drop_user(self, next_hop: int):
+        owners = self.users.get(next_hop) if self.users is not None else None
+        if owners is not None:
+            owners.discard(self.node_id)
+            if not owners:
+                del self.users[next_hop]
+    
     def update_route(self, dest: int, next_hop: int, metric: int, seq: int = 0) -> bool:
-        """Update route if new route is better. Returns True if updated."""
+        """
+        Update route if new route is better, or if it comes from the current next hop (whose word
+        is final, worse or not; INFINITY withdraws the route). Returns True if the route changed.
+        """
         existing = self.routes.get(dest)
         
+        if metric >= INFINITY:
+            # Withdrawal: only counts when it comes from the next hop we use
+            if existing is not None and existing.next_hop == next_hop:
+                self.remove_route(dest)
+                return True
+            return False
+        
         # Always update if new destination
         if not existing:
-            self.routes[dest] = RouteEntry(dest, next_hop, metric, seq)
+            self._set(dest, next_hop, metric, seq, existing)
             return True
         
         # Update if better metric (shorter path)
         if metric < existing.metric:
-            self.routes[dest] = RouteEntry(dest, next_hop, metric, seq)
+            self._set(dest, next_hop, metric, seq, existing)
             return True
         
-        # Update if same metric but from same next_hop (refresh)
-        if metric == existing.metric and next_hop == existing.next_hop:
-            self.routes[dest] = RouteEntry(dest, next_hop, metric, seq)
-            return True
+        if next_hop == existing.next_hop:
+            # The path through our next hop got longer: follow it
+            if metric != existing.metric:
+                self._set(dest, next_hop, metric, seq, existing)
+                return True
+            # Same metric from same next_hop: refresh only, nothing to re-advertise
+            existing.seq = seq
         
         return False
     
+    def remove_route(self, dest: int) -> bool:
+        entry = self.routes.pop(dest, None)
+        if entry is None:
+            return False
+        self._unlink(entry.next_hop, dest)
+        return True
+    
+    def merge_advertisement(self, src: int, routes: Dict[int, int], sender: Optional["RoutingTable"] = None,
+                            held: Iterable[int] = ()) -> List[int]:
+        """
+        update_route(dest, src, metric + 1) for every advertised dest except `held` ones; returns changed dests.
+        Poisoned reverse: dests the sender itself routes through this node count as INFINITY.
+        """
+        skip = sender.via.get(self.node_id, ()) if sender is not None else ()
+        own = self.routes
+        changed = []
+        for dest, metric in routes.items():
+            if dest == self.node_id or dest in held:  # Don't route to self / held down
+                continue
+            metric = INFINITY if dest in skip else metric + 1
+            existing = own.get(dest)
+            if existing is not None and existing.next_hop != src and metric >= existing.metric:
+                continue  # No better than what another neighbor gives us: update_route would ignore it
+            if self.update_route(dest, next_hop=src, metric=metric, seq=0):
+                changed.append(dest)
+        return changed
+    
+    def advertised(self, dests: Optional[Iterable[int]] = None, withdrawn: Iterable[int] = ()) -> Dict[int, int]:
+        """
+        {dest: metric} for all routes (plus INFINITY for the `withdrawn` dests that have none),
+        or only for `dests` (INFINITY where there is no route; never our own id)
+        """
+        routes = self.routes
+        if dests is None:
+            out = {dest: entry.metric for dest, entry in routes.items()}
+            out.update((dest, INFINITY) for dest in withdrawn if dest not in routes)
+            return out
+        return {dest: routes[dest].metric if dest in routes else INFINITY for dest in dests if dest != self.node_id}
+    
+    def drop_via(self, next_hop: int) -> List[int]:
+        """Remove every route through next_hop (reverse index: cost ~ routes removed); returns their dests"""
+        dests = self.via.pop(next_hop, None)
+        if not dests:
+            return []
+        for dest in dests:
+            del self.routes[dest]
+        self._drop_user(next_hop)
+        return list(dests)
+    
+    def detach(self):
+        """Unregister this table from the shared next-hop index (table is being discarded)"""
+        for next_hop in self.via:
+            self._drop_user(next_hop)
+    
     def get_all_routes(self) -> Dict[int, Tuple[int, int]]:
         """Returns {dest: (next_hop, metric)} for all known routes"""
         return {dest: (r.next_hop, r.metric) for dest, r in self.routes.items()}
 
+class RouteOracle:
+    """
+    Centralized shortest-path routing (hop count) over the current adjacency.
+    Per-source BFS results are cached against the topology version; when links change,
+    only sources whose BFS layering the changed links touch are recomputed.
+    Next hop = smallest-id first hop over all shortest paths (independent of visit order).
+    """
+
+    def __init__(self, links_provider: Callable):
+        self.links_provider = links_provider    # () -> topology.Connectivity
+        self.links = None
+        self.dist: Dict[int, Dict[int, int]] = {}   # src -> {dest: hops}
+        self.first: Dict[int, Dict[int, int]] = {}  # src -> {dest: next hop}
+        self.bfs_runs = 0
+    
+    def _sync(self):
+        links = self.links_provider()
+        old = self.links
+        if old is not None and links.version == old.version:
+            return
+        self.links = links
+        if old is None:
+            return
+        changed = self._changed_edges(old, links)
+        if not changed:
+            return
+        for src in list(self.dist):
+            dist = self.dist[src]
+            for a, b in changed:
+                da, db = dist.get(a), dist.get(b)
+                # Edges inside one BFS layer (or between two unreachable nodes) change nothing
+                if da != db:
+                    del self.dist[src]
+                    del self.first[src]
+                    break
+    
+    @staticmethod
+    def _changed_edges(old, new) -> List[Tuple[int, int]]:
+        changed = []
+        for nid in set(old.ids).union(new.ids):
+            a, b = old.neighbors(nid), new.neighbors(nid)
+            if a != b:
+                changed.extend((nid, other) for other in a ^ b if nid < other)
+        return changed
+    
+    def _table(self, src: int) -> Tuple[Dict[int, int], Dict[int, int]]:
+        self._sync()
+        if src not in self.dist:
+            self._bfs(src)
+        return self.dist[src], self.first[src]
+    
+    def _bfs(self, src: int):
+        self.bfs_runs += 1
+        neighbors = self.links.neighbors
+        dist = {src: 0}
+        first: Dict[int, int] = {}
+        for v in neighbors(src):
+            dist[v] = 1
+            first[v] = v
+        frontier = list(first)
+        depth = 1
+        while frontier:
+            nxt = []
+            for u in frontier:
+                fu = first[u]
+                for v in neighbors(u):
+                    dv = dist.get(v)
+                    if dv is None:
+                        dist[v] = depth + 1
+                        first[v] = fu
+                        nxt.append(v)
+                    elif dv == depth + 1 and fu < first[v]:
+                        first[v] = fu
+            frontier = nxt
+            depth += 1
+        self.dist[src] = dist
+        self.first[src] = first
+    
+    def next_hop(self, src: int, dest: int) -> Optional[int]:
+        return self._table(src)[1].get(dest)
+    
+    def routes(self, src: int) -> Dict[int, Tuple[int, int]]:
+        """{dest: (next_hop, metric)}, same shape as RoutingTable.get_all_routes"""
+        dist, first = self._table(src)
+        return {dest: (hop, dist[dest]) for dest, hop in first.items()}
+
 @dataclass 
 class RouteAdvertisement:
     """Route advertisement packet (sent periodically)"""
@@ -64,33 +253,112 @@ class RouteAdvertisement:
 class NetworkLayer:
     """
     Simple distance-vector network layer
-    - Periodic route advertisements
+    - Periodic route advertisements (deltas when incremental, full every full_refresh_every rounds)
+    - Triggered delta advertisements shortly after a table changes
     - Next-hop forwarding
     """
     routing_tables: Dict[int, RoutingTable] = field(default_factory=dict)
     route_ad_interval: float = 2.0              # Send route ads every 2 sec
     last_route_ad: float = 0.0
     seq_counter: Dict[int, int] = field(default_factory=dict)
+    incremental: bool = True                    # False = every node advertises its full table every round
+    full_refresh_every: int = 15                # Periodic rounds between full-table refreshes
+    triggered_delay: float = 0.1                # Delay before a triggered update goes out (batches changes)
+    dirty: Dict[int, Set[int]] = field(default_factory=dict)  # node -> dests changed since its last ad
+    rounds: int = 0
+    force_full: bool = False                    # Next periodic round is a full refresh
+    ad_entries_sent: int = 0                    # Route entries carried by all ads (cost counter)
+    mode: str = "dv"                            # "dv" (distance vector) | "oracle" (centralized BFS)
+    oracle: Optional[RouteOracle] = None        # Set up by the owner (needs an adjacency provider)
+    matrix: Optional[Any] = None                # routearray.RouteMatrix = array-backed tables (else dict tables)
+    next_hop_users: Dict[int, Set[int]] = field(default_factory=dict)  # next_hop -> nodes with a route through it (dict tables)
+    round_mode: str = "sequential"              # "sequential" (ads in node order) | "jacobi" (synchronous min-plus step, array tables)
+    lost: Dict[int, Set[int]] = field(default_factory=dict)  # node -> dests it lost since the last round (held down, then re-learnt)
+    hop_limit: int = INFINITY                   # forwarded packets are dropped after this many hops
+    hop_limit_drops: int = 0
     
     def init_node(self, node_id: int):
         """Initialize routing table for a node"""
         if node_id not in self.routing_tables:
-            self.routing_tables[node_id] = RoutingTable(node_id)
+            if self.matrix is not None:
+                from .routearray import ArrayRoutingTable
+                self.routing_tables[node_id] = ArrayRoutingTable(self.matrix, node_id)
+            else:
+                self.routing_tables[node_id] = RoutingTable(node_id, users=self.next_hop_users)
             self.seq_counter[node_id] = 0
+            self.dirty[node_id] = set()
     
     def remove_node(self, node_id: int):
         """Remove node's routing state"""
-        self.routing_tables.pop(node_id, None)
+        table = self.routing_tables.pop(node_id, None)
         self.seq_counter.pop(node_id, None)
-        # Remove routes through this node from all other tables
-        for table in self.routing_tables.values():
-            to_remove = [dest for dest, entry in table.routes.items() 
-                        if entry.next_hop == node_id]
-            for dest in to_remove:
-                table.routes.pop(dest)
+        self.dirty.pop(node_id, None)
+        self.lost.pop(node_id, None)
+        # Remove routes to and through this node from all other tables; the others go out as withdrawals
+        if self.matrix is not None:
+            dropped = self.matrix.release(node_id)
+        else:
+            if table is not None:
+                table.detach()
+            dropped = [(owner, self.routing_tables[owner].drop_via(node_id)) for owner in self.next_hop_users.pop(node_id, ())]
+            for table in self.routing_tables.values():
+                table.remove_route(node_id)
+        for owner, dests in dropped:
+            dests = [d for d in dests if d != node_id]
+            if dests:
+                self._withdrawn(owner, dests)
+        # Neighbors may hold routes that just vanished here; let everyone re-learn them
+        self.force_full = True
+    
+    def link_down(self, a: int, b: int):
+        """Drop the routes each end had through the other; they go out as withdrawals with the next ad"""
+        for x, y in ((a, b), (b, a)):
+            table = self.routing_tables.get(x)
+            dests = table.drop_via(y) if table is not None else None
+            if dests:
+                self._withdrawn(x, dests)
+    
+    def take_lost(self) -> Dict[int, Set[int]]:
+        """Node -> dests it lost since the last call; the hold-down ends (neighbors should re-send those routes)"""
+        lost, self.lost = self.lost, {}
+        if self.matrix is not None:
+            self.matrix.end_hold_down()
+        return lost
+    
+    def _withdrawn(self, node_id: int, dests: Iterable[int]):
+        """
+        Routes node_id just lost: advertised as withdrawals, and offers for them are ignored until the
+        next round, so the node can't pick up a route that still leads back through the break
+        """
+        self.dirty[node_id].update(dests)
+        self.lost.setdefault(node_id, set()).update(dests)
+        if self.matrix is not None:
+            self.matrix.hold_down(node_id, dests)
+    
+    def _changed(self, receiver_id: int, dests: List[int]) -> bool:
+        """Record changed dests for the next ad; True if some of them were withdrawn"""
+        table = self.routing_tables[receiver_id]
+        gone = [d for d in dests if table.get_next_hop(d) is None]
+        if gone:
+            self._withdrawn(receiver_id, gone)
+        self.dirty[receiver_id].update(dests)
+        return bool(gone)
+    
+    def next_round_full(self) -> bool:
+        """Start a periodic round; True if it must carry full tables"""
+        self.rounds += 1
+        full = not self.incremental or self.force_full or self.rounds % self.full_refresh_every == 0
+        self.force_full = False
+        return full
+    
+    def pending_nodes(self) -> Set[int]:
+        """Nodes with changed routes not yet advertised"""
+        return {nid for nid, dests in self.dirty.items() if dests}
     
     def get_next_hop(self, src: int, dest: int) -> Optional[int]:
         """Get next hop from src to dest, None if no route"""
+        if self.mode == "oracle":
+            return self.oracle.next_hop(src, dest) if src in self.routing_tables else None
         table = self.routing_tables.get(src)
         if not table:
             return None
@@ -112,22 +380,48 @@ class NetworkLayer:
         table = self.routing_tables[receiver_id]
         changed = False
         
+        dirty = self.dirty[receiver_id]
+        
         # Add/update route to the advertising node (direct neighbor)
         if table.update_route(ad.src, ad.src, metric=1, seq=0):
+            dirty.add(ad.src)
             changed = True
         
         # Update routes to destinations advertised by this neighbor
-        for dest, metric in ad.routes.items():
-            if dest == receiver_id:  # Don't route to self
-                continue
-            new_metric = metric + 1  # Add one hop
-            if table.update_route(dest, next_hop=ad.src, metric=new_metric, seq=0):
-                changed = True
+        updated = table.merge_advertisement(ad.src, ad.routes, self.routing_tables.get(ad.src), self.lost.get(receiver_id, ()))
+        if updated:
+            self._changed(receiver_id, updated)
+            changed = True
         
         return changed
     
-    def generate_route_advertisement(self, node_id: int) -> RouteAdvertisement:
-        """Generate route advertisement for a node"""
+    def broadcast(self, ad: RouteAdvertisement, receivers: Iterable[int], neighbors_of: Callable[[int], Set[int]]):
+        """process_route_advertisement for every receiver; one vectorized step with array tables"""
+        routes = ad.routes
+        if self.matrix is not None and getattr(routes, "matrix", None) is self.matrix:
+            receivers = [r for r in receivers if r in self.routing_tables and ad.src in neighbors_of(r)]
+            if receivers:
+                for receiver_id, dests in self.matrix.broadcast(ad.src, routes.cols, routes.metrics, receivers):
+                    self._changed(receiver_id, dests)
+            return
+        for receiver_id in receivers:
+            self.process_route_advertisement(ad, receiver_id, neighbors_of(receiver_id))
+    
+    def synchronous_round(self, adv: List[int], recv: List[int]) -> Set[int]:
+        """
+        Jacobi round over directed links adv[i] -> recv[i]: every advertiser's start-of-round
+        table at once (array tables only). Advertisers' pending changes count as sent.
+        Returns the receivers that had routes withdrawn.
+        """
+        for nid in set(adv):
+            dirty = self.dirty.get(nid)
+            if dirty:
+                self.ad_entries_sent += len(dirty)
+                dirty.clear()
+        return {receiver_id for receiver_id, dests in self.matrix.relax(adv, recv) if self._changed(receiver_id, dests)}
+    
+    def generate_route_advertisement(self, node_id: int, full: bool = True) -> RouteAdvertisement:
+        """Generate route advertisement for a node (full table, or only routes changed since its last ad)"""
         table = self.routing_tables.get(node_id)
         if not table:
             return RouteAdvertisement(src=node_id, routes={}, seq=0)
@@ -136,20 +430,26 @@ class NetworkLayer:
         self.seq_counter[node_id] = self.seq_counter.get(node_id, 0) + 1
         seq = self.seq_counter[node_id]
         
-        # Advertise all known routes
-        routes = {dest: entry.metric for dest, entry in table.routes.items()}
+        dirty = self.dirty.get(node_id)
+        # Full ads still carry withdrawals, or neighbors routing through us would never hear of them
+        routes = table.advertised(None, dirty or ()) if full or dirty is None else table.advertised(dirty)
+        if dirty:
+            dirty.clear()
+        self.ad_entries_sent += len(routes)
         
         return RouteAdvertisement(src=node_id, routes=routes, seq=seq)
     
-    def should_send_route_ad(self, now: float) -> bool:
-        """Check if it's time to send periodic route advertisements"""
-        if now - self.last_route_ad >= self.route_ad_interval:
-            self.last_route_ad = now
-            return True
-        return False
+    def full_advertisement(self, node_id: int, dests: Optional[Iterable[int]] = None) -> RouteAdvertisement:
+        """Whole table for a newly linked neighbor, or just `dests` for one re-learning them (leaves the delta state alone)"""
+        table = self.routing_tables.get(node_id)
+        routes = table.advertised(dests) if table else {}
+        self.ad_entries_sent += len(routes)
+        return RouteAdvertisement(src=node_id, routes=routes, seq=self.seq_counter.get(node_id, 0))
     
     def get_routing_table(self, node_id: int) -> Dict[int, Tuple[int, int]]:
         """Get routing table for a node as {dest: (next_hop, metric)}"""
+        if self.mode == "oracle":
+            return self.oracle.routes(node_id) if node_id in self.routing_tables else {}
         table = self.routing_tables.get(node_id)
         if not table:
             return {}
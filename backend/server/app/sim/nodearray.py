@@ -0,0 +1,163 @@
+"""
+Array-backed node store (optional, needs numpy)
+- Struct-of-arrays: one NumPy column per hot field (x, y, energy, sleep_ratio, awake, PHY index)
+- ArrayNode / ArrayPosition are Node-compatible views over one slot
+- Energy and duty cycle for every node in a handful of vectorized operations
+"""
+from __future__ import annotations
+from typing import List, Set
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the array-backed store
+    np = None
+
+from .engine import PHY_PROFILES
+
+PHY_NAMES: List[str] = list(PHY_PROFILES)            # PHY index -> name
+PHY_INDEX = {name: i for i, name in enumerate(PHY_NAMES)}
+
+class NodeArrays:
+    """Column storage for node state, indexed by slot (slots of removed nodes are reused)"""
+
+    def __init__(self, capacity: int = 1024):
+        if np is None:
+            raise RuntimeError("array-backed node store requires numpy")
+        self.capacity = 0
+        self.size = 0                   # high-water mark of used slots
+        self.free: List[int] = []       # released slots
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.energy = np.zeros(0)
+        self.sleep_ratio = np.zeros(0)
+        self.awake = np.zeros(0, dtype=bool)
+        self.phy = np.zeros(0, dtype=np.int8)
+        self.idle_energy = np.array([PHY_PROFILES[p]["idle_energy"] for p in PHY_NAMES])
+        self.sleep_energy = np.array([PHY_PROFILES[p]["sleep_energy"] for p in PHY_NAMES])
+        self.ranges = np.array([PHY_PROFILES[p]["range"] for p in PHY_NAMES])
+        self._grow(max(1, capacity))
+
+    def _grow(self, capacity: int):
+        for name in ("x", "y", "energy", "sleep_ratio", "awake", "phy"):
+            old = getattr(self, name)
+            col = np.zeros(capacity, dtype=old.dtype)
+            col[:len(old)] = old
+            setattr(self, name, col)
+        self.capacity = capacity
+
+    def alloc(self, phy: str, x: float, y: float, energy: float, sleep_ratio: float) -> int:
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow(self.capacity * 2)
+            slot = self.size
+            self.size += 1
+        self.x[slot] = x
+        self.y[slot] = y
+        self.energy[slot] = energy
+        self.sleep_ratio[slot] = sleep_ratio
+        self.awake[slot] = True
+        self.phy[slot] = PHY_INDEX[phy]
+        return slot
+
+    def release(self, slot: int):
+        self.energy[slot] = 0.0
+        self.free.append(slot)
+
+    def energy_tick(self, dt: float, sim_time: float, cycle_time: float = 1.0):
+        """Vectorized engine.energy_tick over all slots for the interval [sim_time - dt, sim_time]"""
+        n = self.size
+        if n == 0 or dt <= 0:
+            return
+        sleep_span = cycle_time * self.sleep_ratio[:n]
+        awake = self._awake_time(sleep_span, sim_time, cycle_time) - self._awake_time(sleep_span, sim_time - dt, cycle_time)
+        phy = self.phy[:n]
+        energy = self.energy[:n]
+        energy -= self.idle_energy[phy] * awake + self.sleep_energy[phy] * (dt - awake)
+        np.maximum(energy, 0.0, out=energy)
+        self.awake[:n] = (sim_time % cycle_time) > sleep_span
+
+    @staticmethod
+    def _awake_time(sleep_span, t: float, cycle_time: float):
+        cycles, phase = divmod(t, cycle_time)
+        return cycles * (cycle_time - sleep_span) + np.maximum(0.0, phase - sleep_span)
+
+class ArrayPosition:
+    """Position view over one slot of NodeArrays"""
+    __slots__ = ("_arrays", "_slot")
+
+    def __init__(self, arrays: NodeArrays, slot: int):
+        self._arrays = arrays
+        self._slot = slot
+
+    @property
+    def x(self) -> float:
+        return float(self._arrays.x[self._slot])
+
+    @x.setter
+    def x(self, value: float):
+        self._arrays.x[self._slot] = value
+
+    @property
+    def y(self) -> float:
+        return float(self._arrays.y[self._slot])
+
+    @y.setter
+    def y(self, value: float):
+        self._arrays.y[self._slot] = value
+
+    def __repr__(self) -> str:
+        return f"ArrayPosition(x={self.x}, y={self.y})"
+
+class ArrayNode:
+    """Node-compatible view: hot fields live in NodeArrays, the rest are plain attributes"""
+    __slots__ = ("id", "role", "subscribed_topics", "is_broker", "mobile", "speed", "slot", "pos", "_arrays")
+
+    def __init__(self, arrays: NodeArrays, id: int, role: str, phy: str, x: float, y: float,
+                 energy: float = 100.0, sleep_ratio: float = 0.2, is_broker: bool = False,
+                 mobile: bool = False, speed: float = 0.0):
+        self._arrays = arrays
+        self.slot = arrays.alloc(phy, x, y, energy, sleep_ratio)
+        self.pos = ArrayPosition(arrays, self.slot)
+        self.id = id
+        self.role = role
+        self.subscribed_topics: Set[str] = set()
+        self.is_broker = is_broker
+        self.mobile = mobile
+        self.speed = speed
+
+    @property
+    def phy(self) -> str:
+        return PHY_NAMES[self._arrays.phy[self.slot]]
+
+    @phy.setter
+    def phy(self, value: str):
+        self._arrays.phy[self.slot] = PHY_INDEX[value]
+
+    @property
+    def energy(self) -> float:
+        return float(self._arrays.energy[self.slot])
+
+    @energy.setter
+    def energy(self, value: float):
+        self._arrays.energy[self.slot] = value
+
+    @property
+    def sleep_ratio(self) -> float:
+        return float(self._arrays.sleep_ratio[self.slot])
+
+    @sleep_ratio.setter
+    def sleep_ratio(self, value: float):
+        self._arrays.sleep_ratio[self.slot] = value
+
+    @property
+    def awake(self) -> bool:
+        return bool(self._arrays.awake[self.slot])
+
+    @awake.setter
+    def awake(self, value: bool):
+        self._arrays.awake[self.slot] = value
+
+    def __repr__(self) -> str:
+        return f"ArrayNode(id={self.id}, role={self.role!r}, phy={self.phy!r}, pos={self.pos!r}, energy={self.energy})"
@@ -0,0 +1,397 @@
+"""
+Array-backed routing tables (optional, needs numpy)
+- One dense N x N matrix per field (next hop, metric, seq), rows/columns indexed by node slot
+- ArrayRoutingTable is a RoutingTable-compatible view over one row
+- Advertisement merges, table dumps and next-hop purges are vectorized
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from collections.abc import MutableMapping
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the array-backed routing tables
+    np = None
+
+from .network import INFINITY, RouteEntry
+
+NO_ROUTE = -1
+
+class RouteMatrix:
+    """Routing state of every node; slots of removed nodes are reused"""
+
+    def __init__(self, capacity: int = 64):
+        if np is None:
+            raise RuntimeError("array-backed routing tables require numpy")
+        self.capacity = 0
+        self.size = 0                           # high-water mark of used slots
+        self.free: List[int] = []
+        self.slot_of: Dict[int, int] = {}       # node_id -> slot
+        self.ids = np.zeros(0, dtype=np.int64)  # slot -> node_id (NO_ROUTE if free)
+        self.next_hop = np.zeros((0, 0), dtype=np.int32)  # [src slot, dest slot] -> next hop node id
+        self.metric = np.zeros((0, 0), dtype=np.int16)    # hop count
+        self.seq = np.zeros((0, 0), dtype=np.int32)
+        self.held = np.zeros((0, 0), dtype=bool)          # [src slot, dest slot] -> held down (offers ignored)
+        self.holding = False                              # any held entry, so the common case skips the mask
+        self._grow(max(1, capacity))
+
+    def _grow(self, capacity: int):
+        n = self.capacity
+        ids = np.full(capacity, NO_ROUTE, dtype=np.int64)
+        ids[:n] = self.ids
+        self.ids = ids
+        for name, fill in (("next_hop", NO_ROUTE), ("metric", 0), ("seq", 0), ("held", False)):
+            old = getattr(self, name)
+            col = np.full((capacity, capacity), fill, dtype=old.dtype)
+            col[:n, :n] = old
+            setattr(self, name, col)
+        self.capacity = capacity
+
+    def alloc(self, node_id: int) -> int:
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow(self.capacity + max(64, self.capacity // 4))  # N x N, so grow gently
+            slot = self.size
+            self.size += 1
+        self.slot_of[node_id] = slot
+        self.ids[slot] = node_id
+        return slot
+
+    def release(self, node_id: int) -> List[Tuple[int, List[int]]]:
+        """Forget a node: its row, its column and every route through it; returns drop_via's result"""
+        slot = self.slot_of.pop(node_id, None)
+        if slot is None:
+            return []
+        n = self.size
+        self.next_hop[slot, :n] = NO_ROUTE
+        self.next_hop[:n, slot] = NO_ROUTE
+        self.held[slot, :n] = False
+        self.held[:n, slot] = False
+        dropped = self.drop_via(node_id)
+        self.ids[slot] = NO_ROUTE
+        self.free.append(slot)
+        return dropped
+
+    def drop_via(self, node_id: int) -> List[Tuple[int, List[int]]]:
+        """Remove every route whose next hop is node_id, in all tables at once; returns (owner, dests) pairs"""
+        n = self.size
+        hops = self.next_hop[:n, :n]
+        rr, cc = np.nonzero(hops == node_id)
+        hops[rr, cc] = NO_ROUTE
+        if len(rr) == 0:
+            return []
+        bounds = np.flatnonzero(np.diff(rr)) + 1
+        return [(int(self.ids[g[0]]), self.ids[c].tolist()) for g, c in zip(np.split(rr, bounds), np.split(cc, bounds))]
+
+    def hold_down(self, node_id: int, dests: Iterable[int]):
+        """Ignore offers for these dests at node_id until end_hold_down()"""
+        slot_of = self.slot_of
+        self.held[slot_of[node_id], [slot_of[d] for d in dests if d in slot_of]] = True
+        self.holding = True
+
+    def end_hold_down(self):
+        if self.holding:
+            self.held[:self.size, :self.size] = False
+            self.holding = False
+
+    def broadcast(self, src: int, cols, metrics, receivers: List[int]) -> List[Tuple[int, List[int]]]:
+        """
+        One advertisement (dest columns + metrics) processed by all its receivers at once.
+        Exactly process_route_advertisement per receiver: each receiver only writes its own row
+        and the advertiser's row is read-only here. Returns (receiver, changed dests) pairs.
+        """
+        src_slot = self.slot_of[src]
+        k = len(receivers)
+        rids = np.fromiter(receivers, dtype=np.int64, count=k)
+        rslots = np.fromiter((self.slot_of[r] for r in receivers), dtype=np.int64, count=k)
+        changed_r: List = []
+        changed_c: List = []
+
+        # Route to the advertiser itself (metric 1)
+        hop0 = self.next_hop[rslots, src_slot]
+        first = (hop0 == NO_ROUTE) | (self.metric[rslots, src_slot] > 1)
+        self.next_hop[rslots[first], src_slot] = src
+        self.metric[rslots[first], src_slot] = 1
+        self.seq[rslots[first | (hop0 == src)], src_slot] = 0
+        changed_r.append(np.flatnonzero(first))
+        changed_c.append(np.full(int(first.sum()), src_slot, dtype=np.int64))
+
+        if len(cols):
+            block = np.ix_(rslots, cols)
+            hops = self.next_hop[block]
+            cur = self.metric[block]
+            # Poisoned reverse against the advertiser's own next hops; never route to self
+            cand = np.where(self.next_hop[src_slot, cols][None, :] == rids[:, None], INFINITY, metrics[None, :] + 1)
+            valid = cols[None, :] != rslots[:, None]
+            if self.holding:
+                valid &= ~self.held[block]
+            from_hop = valid & (hops == src)
+            usable = valid & (cand < INFINITY)
+            better = usable & ((hops == NO_ROUTE) | (cand < cur) | (from_hop & (cand != cur)))
+            refresh = usable & ~better & from_hop
+            withdrawn = from_hop & (cand >= INFINITY)
+            rr, cc = np.nonzero(better)
+            self.next_hop[rslots[rr], cols[cc]] = src
+            self.metric[rslots[rr], cols[cc]] = cand[rr, cc]
+            fr, fc = np.nonzero(better | refresh)
+            self.seq[rslots[fr], cols[fc]] = 0
+            wr, wc = np.nonzero(withdrawn)
+            self.next_hop[rslots[wr], cols[wc]] = NO_ROUTE
+            changed_r.extend((rr, wr))
+            changed_c.extend((cols[cc], cols[wc]))
+
+        rr = np.concatenate(changed_r)
+        if len(rr) == 0:
+            return []
+        dests = self.ids[np.concatenate(changed_c)]
+        order = np.argsort(rr, kind="stable")
+        rr, dests = rr[order], dests[order]
+        bounds = np.flatnonzero(np.diff(rr)) + 1
+        return [(receivers[int(g[0])], d.tolist()) for g, d in zip(np.split(rr, bounds), np.split(dests, bounds))]
+
+    def relax(self, adv, recv, budget: int = 1 << 24) -> List[Tuple[int, List[int]]]:
+        """
+        Synchronous (Jacobi) min-plus step over directed edges adv[i] -> recv[i] (node ids):
+        every receiver takes the best of its advertisers' start-of-step tables. Ties keep the
+        existing route, else the advertiser listed first wins. When the current next hop advertises,
+        its metric is taken even if worse (or the route dropped if it has none), unless a neighbor
+        with a lower metric than the receiver's can take over. Dests a receiver holds down are
+        skipped. Returns (receiver, changed dests).
+        """
+        if len(adv) == 0:
+            return []
+        n = self.size
+        slot_of = self.slot_of
+        adv_slot = np.fromiter((slot_of[a] for a in adv), dtype=np.int64, count=len(adv))
+        recv_slot = np.fromiter((slot_of[r] for r in recv), dtype=np.int64, count=len(recv))
+        order = np.lexsort((np.arange(len(adv)), recv_slot))
+        adv_slot, recv_slot = adv_slot[order], recv_slot[order]
+
+        # Candidates are packed as (metric << 16) | rank of the edge among its receiver's edges,
+        # so one running minimum yields both the best metric and the first advertiser offering it
+        none = np.int32(0x7FFF << 16)
+        uniq, adv_idx = np.unique(adv_slot, return_inverse=True)
+        snap_hop = self.next_hop[uniq, :n].copy()  # start-of-step snapshot of every advertiser row
+        snap_metric = self.metric[uniq, :n].astype(np.int32) + 1
+        snap_key = np.where((snap_hop == NO_ROUTE) | (snap_metric >= INFINITY), none, snap_metric << 16)
+
+        starts = np.flatnonzero(np.r_[True, recv_slot[1:] != recv_slot[:-1]])
+        counts = np.diff(np.r_[starts, len(recv_slot)])
+        rank = np.arange(len(recv_slot)) - np.repeat(starts, counts)
+        group = np.repeat(np.arange(len(starts)), counts)
+
+        out: List[Tuple[int, List[int]]] = []
+        per_chunk = max(1, budget // max(1, n))
+        for g0 in range(0, len(starts), per_chunk):
+            g1 = min(len(starts), g0 + per_chunk)
+            rows = recv_slot[starts[g0:g1]]
+            row_ids = self.ids[rows]
+            cur_hop = self.next_hop[rows, :n]
+            acc = np.full((g1 - g0, n), none, dtype=np.int32)
+            via = np.full((g1 - g0, n), -1, dtype=np.int32)  # what the current next hop offers (-1: not advertising)
+            hold = self.held[rows, :n] if self.holding else None
+            lo, hi = starts[g0], starts[g1] if g1 < len(starts) else len(recv_slot)
+            e_rank, e_group = rank[lo:hi], group[lo:hi] - g0
+            for k in range(int(e_rank.max()) + 1):
+                sel = lo + np.flatnonzero(e_rank == k)
+                g, a_idx, a_slot = group[sel] - g0, adv_idx[sel], adv_slot[sel]
+                e = np.arange(len(sel))
+                cand = snap_key[a_idx]
+                cand[snap_hop[a_idx] == row_ids[g][:, None]] = none  # poisoned reverse
+                cand[e, rows[g]] = none                             # no route to self
+                if hold is not None:
+                    cand[hold[g]] = none                            # held down
+                cand[e, a_slot] = 1 << 16                           # route to the advertiser
+                via[g] = np.where(cur_hop[g] == self.ids[a_slot][:, None], cand, via[g])
+                cand |= k
+                acc[g] = np.minimum(acc[g], cand)
+
+            best = (acc >> 16).astype(self.metric.dtype)
+            cur_metric = self.metric[rows, :n]
+            moved = (via >= 0) & ((via >> 16) != cur_metric)  # current next hop now offers another metric, or nothing
+            better = (acc < none) & ((cur_hop == NO_ROUTE) | (best < cur_metric))
+            # Its offer got worse: switch only to a neighbor whose own metric is below ours (it can't be
+            # routing through us, even if it switches this step too), else follow the next hop or drop
+            feasible = moved & ~better & (acc < none) & (best <= cur_metric)
+            follow = moved & ~better & ~feasible & (via < none)
+            dropped = moved & ~better & ~feasible & (via >= none)
+            take = better | feasible
+            keep = take & moved & (best == via >> 16)          # ties keep the existing next hop
+            rr, cc = np.nonzero(take)
+            winner = starts[g0 + rr] + (acc[rr, cc] & 0xFFFF)
+            self.next_hop[rows[rr], cc] = np.where(keep[rr, cc], cur_hop[rr, cc], self.ids[adv_slot[winner]])
+            self.metric[rows[rr], cc] = best[rr, cc]
+            self.seq[rows[rr], cc] = 0
+            fr, fc = np.nonzero(follow)
+            self.metric[rows[fr], fc] = via[fr, fc] >> 16
+            self.seq[rows[fr], fc] = 0
+            dr, dc = np.nonzero(dropped)
+            self.next_hop[rows[dr], dc] = NO_ROUTE
+            rr, cc = np.nonzero(take | follow | dropped)
+            if len(rr):
+                bounds = np.flatnonzero(np.diff(rr)) + 1
+                for gg, d in zip(np.split(rr, bounds), np.split(cc, bounds)):
+                    out.append((int(row_ids[gg[0]]), self.ids[d].tolist()))
+        return out
+
+    def nbytes(self) -> int:
+        return self.next_hop.nbytes + self.metric.nbytes + self.seq.nbytes + self.held.nbytes + self.ids.nbytes
+
+class PackedRoutes(dict):
+    """{dest: metric} advertisement that also carries its matrix columns, so receivers skip re-packing"""
+
+    def __init__(self, matrix: RouteMatrix, cols, metrics):
+        super().__init__(zip(matrix.ids[cols].tolist(), metrics.tolist()))
+        self.matrix = matrix
+        self.cols = cols
+        self.metrics = metrics
+
+class RouteRow(MutableMapping):
+    """dest -> RouteEntry mapping view over one matrix row (entries are built on access)"""
+
+    def __init__(self, matrix: RouteMatrix, slot: int):
+        self._m = matrix
+        self._slot = slot
+
+    def _col(self, dest: int) -> Optional[int]:
+        col = self._m.slot_of.get(dest)
+        if col is None or self._m.next_hop[self._slot, col] == NO_ROUTE:
+            return None
+        return col
+
+    def __getitem__(self, dest: int) -> RouteEntry:
+        col = self._col(dest)
+        if col is None:
+            raise KeyError(dest)
+        m, row = self._m, self._slot
+        return RouteEntry(dest, int(m.next_hop[row, col]), int(m.metric[row, col]), int(m.seq[row, col]))
+
+    def __setitem__(self, dest: int, entry: RouteEntry):
+        m, row, col = self._m, self._slot, self._m.slot_of[dest]
+        m.next_hop[row, col] = entry.next_hop
+        m.metric[row, col] = entry.metric
+        m.seq[row, col] = entry.seq
+
+    def __delitem__(self, dest: int):
+        col = self._col(dest)
+        if col is None:
+            raise KeyError(dest)
+        self._m.next_hop[self._slot, col] = NO_ROUTE
+
+    def cols(self):
+        """Matrix columns (dest slots) that hold a route"""
+        return np.flatnonzero(self._m.next_hop[self._slot, :self._m.size] != NO_ROUTE)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._m.ids[self.cols()].tolist())
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._m.next_hop[self._slot, :self._m.size] != NO_ROUTE))
+
+class ArrayRoutingTable:
+    """RoutingTable-compatible view over one node's row of a RouteMatrix"""
+    __slots__ = ("node_id", "slot", "routes", "_m")
+
+    def __init__(self, matrix: RouteMatrix, node_id: int):
+        self._m = matrix
+        self.node_id = node_id
+        self.slot = matrix.alloc(node_id)
+        self.routes = RouteRow(matrix, self.slot)
+
+    def get_next_hop(self, dest: int) -> Optional[int]:
+        col = self._m.slot_of.get(dest)
+        if col is None:
+            return None
+        hop = int(self._m.next_hop[self.slot, col])
+        return None if hop == NO_ROUTE else hop
+
+    def update_route(self, dest: int, next_hop: int, metric: int, seq: int = 0) -> bool:
+        """Same rules as RoutingTable.update_route (better, or anything from the current next hop)"""
+        m, row, col = self._m, self.slot, self._m.slot_of.get(dest)
+        if col is None:
+            return False
+        hop = m.next_hop[row, col]
+        if metric >= INFINITY:
+            if hop == next_hop:
+                m.next_hop[row, col] = NO_ROUTE
+                return True
+            return False
+        if hop == NO_ROUTE or metric < m.metric[row, col] or (next_hop == hop and metric != m.metric[row, col]):
+            m.next_hop[row, col] = next_hop
+            m.metric[row, col] = metric
+            m.seq[row, col] = seq
+            return True
+        if next_hop == hop:
+            m.seq[row, col] = seq
+        return False
+
+    def merge_advertisement(self, src: int, routes: Dict[int, int], sender: Optional["ArrayRoutingTable"] = None,
+                            held: Iterable[int] = ()) -> List[int]:
+        """Vectorized update_route(dest, src, metric + 1) for every advertised dest but `held` ones (poisoned reverse); returns changed dests"""
+        m, row = self._m, self.slot
+        if isinstance(routes, PackedRoutes) and routes.matrix is m:
+            keep = routes.cols != row  # Don't route to self
+            cols, new_metric = routes.cols[keep], routes.metrics[keep] + 1
+        else:
+            slot_of = m.slot_of
+            pairs = [(slot_of[d], mt) for d, mt in routes.items() if d != self.node_id and d in slot_of]
+            cols = np.fromiter((c for c, _ in pairs), dtype=np.int64, count=len(pairs))
+            new_metric = np.fromiter((mt for _, mt in pairs), dtype=np.int16, count=len(pairs)) + 1
+        if len(cols) == 0:
+            return []
+        if held:
+            keep = ~np.isin(cols, [m.slot_of[d] for d in held if d in m.slot_of])
+            cols, new_metric = cols[keep], new_metric[keep]
+        if sender is not None:
+            new_metric[m.next_hop[sender.slot, cols] == self.node_id] = INFINITY  # sender routes these through us
+        hops = m.next_hop[row, cols]
+        metrics = m.metric[row, cols]
+        from_hop = hops == src
+        valid = new_metric < INFINITY
+        better = valid & ((hops == NO_ROUTE) | (new_metric < metrics) | (from_hop & (new_metric != metrics)))
+        withdrawn = ~valid & from_hop
+        refresh = valid & ~better & from_hop
+        changed = cols[better]
+        m.next_hop[row, changed] = src
+        m.metric[row, changed] = new_metric[better]
+        m.seq[row, cols[better | refresh]] = 0
+        m.next_hop[row, cols[withdrawn]] = NO_ROUTE
+        return m.ids[cols[better | withdrawn]].tolist()
+
+    def advertised(self, dests: Optional[Iterable[int]] = None, withdrawn: Iterable[int] = ()) -> Dict[int, int]:
+        """
+        {dest: metric} for all routes (plus INFINITY for the `withdrawn` dests that have none),
+        or only for `dests` (INFINITY where there is no route; never our own id)
+        """
+        m, row = self._m, self.slot
+        slot_of = m.slot_of
+        if dests is None:
+            cols = self.routes.cols()
+            if withdrawn:
+                extra = np.fromiter((slot_of[d] for d in withdrawn if d in slot_of), dtype=np.int64)
+                cols = np.concatenate([cols, extra[m.next_hop[row, extra] == NO_ROUTE]])
+        else:
+            cols = np.fromiter((slot_of[d] for d in dests if d in slot_of and d != self.node_id), dtype=np.int64)
+        metrics = np.where(m.next_hop[row, cols] == NO_ROUTE, INFINITY, m.metric[row, cols]).astype(m.metric.dtype)
+        return PackedRoutes(m, cols, metrics)
+
+    def remove_route(self, dest: int) -> bool:
+        if dest not in self.routes:
+            return False
+        del self.routes[dest]
+        return True
+
+    def drop_via(self, next_hop: int) -> List[int]:
+        """Remove every route through next_hop; returns their dests"""
+        hops = self._m.next_hop[self.slot, :self._m.size]
+        cols = np.flatnonzero(hops == next_hop)
+        hops[cols] = NO_ROUTE
+        return self._m.ids[cols].tolist()
+
+    def get_all_routes(self) -> Dict[int, Tuple[int, int]]:
+        """Returns {dest: (next_hop, metric)} for all known routes"""
+        m, row = self._m, self.slot
+        cols = self.routes.cols()
+        return {d: (h, mt) for d, h, mt in zip(m.ids[cols].tolist(), m.next_hop[row, cols].tolist(), m.metric[row, cols].tolist())}
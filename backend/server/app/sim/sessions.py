@@ -0,0 +1,132 @@
+"""
+Simulation sessions
+- Many isolated Store instances in one server process
+- One scheduler task runs every session's loop round-robin
+- Per-session CPU budget: max wall time a session may step per scheduler round
+- The scheduler yields to the event loop after every slice, so API requests never wait behind a whole round
+"""
+from __future__ import annotations
+import asyncio
+import itertools
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .store import Store, store
+
+DEFAULT_SESSION = "default"
+
+class Session:
+    """One isolated simulation"""
+
+    def __init__(self, session_id: str, store: Store, cpu_budget: float):
+        self.id = session_id
+        self.store = store
+        self.cpu_budget = cpu_budget    # seconds of wall time per scheduler round
+        self.cpu_used = 0.0             # total wall time spent stepping this session
+        self.created = time.time()
+        self.checkpoints: Dict[str, bytes] = {}  # name -> Store.snapshot() bytes
+
+    def view(self) -> dict:
+        s = self.store
+        return {
+            "id": self.id,
+            "running": s.running,
+            "now": s.engine.now,
+            "speed": s.speed,
+            "nodes": len(s.nodes),
+            "cpuBudgetMs": self.cpu_budget * 1000.0,
+            "cpuUsedS": self.cpu_used,
+            "checkpoints": list(self.checkpoints),
+        }
+
+class SessionManager:
+    """Registry of sessions plus the fair scheduler that runs them"""
+
+    def __init__(self, default_store: Optional[Store] = None, cpu_budget: float = 0.02, max_sessions: int = 64):
+        self.cpu_budget = cpu_budget    # default per-session budget (seconds per round)
+        self.max_sessions = max_sessions
+        self.sessions: Dict[str, Session] = {}
+        self._ids = itertools.count(1)
+        self._rr = 0                    # round-robin start offset
+        self.sessions[DEFAULT_SESSION] = Session(DEFAULT_SESSION, default_store or Store(), cpu_budget)
+
+    def create(self, cpu_budget: Optional[float] = None, store: Optional[Store] = None, **store_kwargs) -> Session:
+        """New session around a fresh Store(**store_kwargs), or around an existing store"""
+        if len(self.sessions) >= self.max_sessions:
+            raise ValueError(f"session limit reached ({self.max_sessions})")
+        sid = f"s{next(self._ids)}"
+        while sid in self.sessions:
+            sid = f"s{next(self._ids)}"
+        session = Session(sid, store or Store(**store_kwargs), self.cpu_budget if cpu_budget is None else cpu_budget)
+        self.sessions[sid] = session
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        return self.sessions.get(session_id)
+
+    def list(self) -> List[Session]:
+        return list(self.sessions.values())
+
+    def destroy(self, session_id: str) -> bool:
+        if session_id == DEFAULT_SESSION:
+            raise ValueError("the default session cannot be destroyed")
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.store.pause()
+        return True
+
+    def checkpoint(self, session_id: str, name: Optional[str] = None) -> Tuple[str, int]:
+        """Snapshot a session's current state under `name` (auto-numbered if omitted); returns (name, size)"""
+        session = self.sessions[session_id]
+        name = name or f"c{len(session.checkpoints) + 1}"
+        blob = session.store.snapshot()
+        session.checkpoints[name] = blob
+        return name, len(blob)
+
+    def restore(self, session_id: str, name: str):
+        """Roll a session back to one of its checkpoints"""
+        session = self.sessions[session_id]
+        old = session.store
+        session.store = Store.restore(session.checkpoints[name])
+        old.pause()
+
+    def fork(self, session_id: str, n: int = 1, checkpoint: Optional[str] = None) -> List[Session]:
+        """n new sessions branched from a session's current state (or one of its checkpoints)"""
+        source = self.sessions[session_id]
+        if len(self.sessions) + n > self.max_sessions:
+            raise ValueError(f"session limit reached ({self.max_sessions})")
+        blob = source.checkpoints[checkpoint] if checkpoint else source.store.snapshot()
+        return [self.create(source.cpu_budget, Store.restore(blob)) for _ in range(n)]
+
+    async def run_round(self) -> bool:
+        """
+        Give every running session one slice of at most its CPU budget, starting from a
+        rotating offset so no session is always first, and yield to the event loop after
+        each slice so requests wait for at most one slice however many sessions there are.
+        Returns True if any session wants to run flat out (speed 0), i.e. the caller should not sleep.
+        """
+        sessions = list(self.sessions.values())
+        if not sessions:
+            return False
+        self._rr = (self._rr + 1) % len(sessions)
+        busy = False
+        for session in sessions[self._rr:] + sessions[:self._rr]:
+            store = session.store
+            if not store.running:
+                store.pump()  # keeps pacing state reset while paused
+                continue
+            t0 = time.perf_counter()
+            store.pump(session.cpu_budget)
+            session.cpu_used += time.perf_counter() - t0
+            busy = busy or (store.running and store.speed <= 0)
+            await asyncio.sleep(0)
+        return busy
+
+    async def run(self, dt: float = 0.02):
+        """Scheduler loop: one round per wake, yielding to the event loop in between"""
+        while True:
+            busy = await self.run_round()
+            await asyncio.sleep(0 if busy else dt)
+
+sessions = SessionManager(store)
@@ -0,0 +1,157 @@
+"""
+Uniform-grid spatial index
+- Nodes hashed into square cells (cell size = largest PHY range)
+- Range queries only visit the cells overlapping the query disc
+- Incremental updates as mobile nodes move
+- Neighbor-set / pair range cache invalidated only around moved nodes
+"""
+from __future__ import annotations
+from typing import Dict, FrozenSet, Iterable, Iterator, Optional, Set, Tuple
+import math
+
+from .models import Node
+
+Cell = Tuple[int, int]
+
+class SpatialGrid:
+    """Spatial hash grid over node positions"""
+
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self.cells: Dict[Cell, Dict[int, Node]] = {}  # cell -> {node_id: Node}
+        self.where: Dict[int, Cell] = {}              # node_id -> cell it is filed under
+
+    def cell_of(self, x: float, y: float) -> Cell:
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def update(self, node: Node):
+        """Insert a node or re-file it after it moved (no-op if it stayed in its cell)"""
+        cell = self.cell_of(node.pos.x, node.pos.y)
+        old = self.where.get(node.id)
+        if old == cell:
+            return
+        if old is not None:
+            self._discard(node.id, old)
+        self.cells.setdefault(cell, {})[node.id] = node
+        self.where[node.id] = cell
+
+    def remove(self, node_id: int):
+        cell = self.where.pop(node_id, None)
+        if cell is not None:
+            self._discard(node_id, cell)
+
+    def _discard(self, node_id: int, cell: Cell):
+        bucket = self.cells.get(cell)
+        if bucket is None:
+            return
+        bucket.pop(node_id, None)
+        if not bucket:
+            del self.cells[cell]
+
+    def clear(self):
+        self.cells.clear()
+        self.where.clear()
+
+    def query(self, x: float, y: float, radius: float) -> Iterator[Node]:
+        """Candidate nodes in the cells overlapping the disc (caller does the exact distance check)"""
+        cx0, cy0 = self.cell_of(x - radius, y - radius)
+        cx1, cy1 = self.cell_of(x + radius, y + radius)
+        cells = self.cells
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    yield from bucket.values()
+
+    def ids_around(self, cell: Cell, span: int = 1) -> Iterator[int]:
+        """Ids of nodes filed in the (2*span+1)^2 block of cells centered on `cell`"""
+        cells = self.cells
+        for cx in range(cell[0] - span, cell[0] + span + 1):
+            for cy in range(cell[1] - span, cell[1] + span + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    yield from bucket.keys()
+
+    def maybe_within(self, a_id: int, b_id: int, radius: float) -> bool:
+        """Cheap reject: False if the two nodes' cells are too far apart to be within radius"""
+        a = self.where.get(a_id)
+        b = self.where.get(b_id)
+        if a is None or b is None:
+            return False
+        span = math.ceil(radius / self.cell_size)
+        return abs(a[0] - b[0]) <= span and abs(a[1] - b[1]) <= span
+
+class NeighborCache:
+    """
+    Cached neighbor sets and pairwise in-range results.
+    Entries stay valid until a node near them moves, is added or is removed.
+    """
+
+    def __init__(self):
+        self.neighbors: Dict[int, FrozenSet[int]] = {}      # node_id -> neighbor ids
+        self.pairs: Dict[Tuple[int, int], bool] = {}        # (lo_id, hi_id) -> in range
+        self.pair_keys: Dict[int, Set[Tuple[int, int]]] = {}  # node_id -> cached pair keys involving it
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_neighbors(self, node_id: int) -> Optional[FrozenSet[int]]:
+        cached = self.neighbors.get(node_id)
+        if cached is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cached
+
+    def put_neighbors(self, node_id: int, neighbors: Iterable[int]) -> FrozenSet[int]:
+        frozen = frozenset(neighbors)
+        self.neighbors[node_id] = frozen
+        return frozen
+
+    def get_pair(self, a: int, b: int) -> Optional[bool]:
+        # A cached neighbor set answers the pair query too
+        nbrs = self.neighbors.get(a) if a != b else None
+        if nbrs is not None:
+            self.hits += 1
+            return b in nbrs
+        result = self.pairs.get((a, b) if a < b else (b, a))
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def put_pair(self, a: int, b: int, result: bool):
+        key = (a, b) if a < b else (b, a)
+        self.pairs[key] = result
+        self.pair_keys.setdefault(a, set()).add(key)
+        self.pair_keys.setdefault(b, set()).add(key)
+
+    def invalidate(self, node_id: int, nearby: Iterable[int] = ()):
+        """Drop everything involving node_id plus the neighbor sets of nodes near it"""
+        self.invalidations += 1
+        self.neighbors.pop(node_id, None)
+        for other in nearby:
+            self.neighbors.pop(other, None)
+        for key in self.pair_keys.pop(node_id, ()):
+            self.pairs.pop(key, None)
+            other = key[0] if key[1] == node_id else key[1]
+            keys = self.pair_keys.get(other)
+            if keys is not None:
+                keys.discard(key)
+
+    def clear(self):
+        self.neighbors.clear()
+        self.pairs.clear()
+        self.pair_keys.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "cached_neighbor_sets": len(self.neighbors),
+            "cached_pairs": len(self.pairs),
+        }
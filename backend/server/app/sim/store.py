@@ -1,24 +1,54 @@
 from __future__ import annotations
 import asyncio
-from typing import List, Optional, Set, Dict
+import pickle
+import time
+import zlib
+from typing import FrozenSet, List, Optional, Sequence, Set, Dict, Tuple
 from .models import Node, Position
-from .engine import Engine
+from .engine import Engine, PHY_PROFILES, in_range
 import math
 
 from .mac import Mac
 from .types import Packet, MacConfig
-from .network import NetworkLayer, RouteAdvertisement
+from .network import NetworkLayer, RouteAdvertisement, RouteOracle
 from .mqtt import MqttBroker, MqttClient, MqttMessage
-from .mobility import RandomWaypointMobility, GridMobility, MobilityModel
+from .mobility import RandomWaypointMobility, GridMobility, MobilityModel, BatchMobility
+from .spatial import SpatialGrid, NeighborCache
+from .nodearray import NodeArrays, ArrayNode, np
+from .topology import Connectivity, build_connectivity, connectivity_from_neighbors
+from .routearray import RouteMatrix
+from .traffic import SOURCE_KINDS, TrafficSource
+
+MAX_RANGE = max(p["range"] for p in PHY_PROFILES.values())
+BULK_LINKS_MIN_NODES = 64  # below this, numpy call overhead outweighs the vectorized link build
+ANIMATED_PER_FLOW = 50  # first-hop animations start at progress i * 0.02, so only 50 are ever shown
+# Routing option -> (NetworkLayer.mode, NetworkLayer.round_mode); "jacobi" needs array route tables
+ROUTING_MODES = {"dv": ("dv", "sequential"), "jacobi": ("dv", "jacobi"), "oracle": ("oracle", "sequential")}
 
 class Store:
-    def __init__(self):
+    def __init__(self, array_backed: bool = False, batch_mobility: bool = False, mobility_rng: str = "numpy", seed: int = 123,
+                 routing: str = "dv", route_tables: str = "dict", channel: str = "global", mac_cfg: Optional[MacConfig] = None):
+        self.seed = seed
+        self.routing = routing  # "dv" (distance-vector protocol), "jacobi" (distance vector in synchronous rounds) or "oracle" (centralized BFS over the live adjacency)
+        self.route_tables = route_tables  # "dict" (RouteEntry per route) or "array" (NumPy RouteMatrix)
+        self.channel = mac_cfg.channel if mac_cfg is not None else channel  # MAC medium: "global" (one collision domain) or "spatial" (per-neighborhood contention)
+        self.mac_cfg = mac_cfg  # full MAC settings for every Mac built here (None: defaults on `channel`)
+        self.array_backed = array_backed  # keep hot node state in NumPy columns (NodeArrays)
+        self.batch_mobility = batch_mobility  # advance all mobile nodes in one vectorized step
+        self.mobility_rng = mobility_rng  # BatchMobility RNG: "numpy" (seeded generator) or "per_node"
+        self.mobility: Optional[BatchMobility] = BatchMobility(seed, mobility_rng) if batch_mobility else None
+        self.arrays: Optional[NodeArrays] = NodeArrays() if array_backed else None
         self.nodes: List[Node] = []
+        self.node_index: Dict[int, Node] = {}  # node_id -> Node
         self.logs = []  # DeliveryLog list (empty in PR1)
         self.running: bool = False
-        self.engine = Engine()
-        self.mac = Mac(seed=123, cfg=MacConfig(), range_checker=self._check_range, forward_callback=self._forward_packet)  
-        self.network = NetworkLayer()  # Network layer routing
+        self.engine = Engine(self.arrays)
+        self.mac = self._new_mac()
+        self.network = self._new_network()  # Network layer routing
+        self.grid = SpatialGrid(MAX_RANGE)  # Spatial index for neighbor / range queries
+        self.neighbor_cache = NeighborCache()  # Neighbor sets / pair range results, invalidated by movement
+        self.topology_version = 0  # bumped whenever a node moves, appears or disappears
+        self._links: Optional[Connectivity] = None  # bulk adjacency for topology_version (built lazily)
         self.mqtt_brokers: Dict[int, MqttBroker] = {}  # node_id -> MqttBroker
         self.mqtt_clients: Dict[int, MqttClient] = {}  # node_id -> MqttClient
         self.mqtt_pending_deliveries: List[tuple] = []  # (subscriber_id, message, effective_qos) pending delivery
@@ -36,24 +66,106 @@ class Store:
         self._next_seq = 1
         self._next_msg_id = 1
         self._task: Optional[asyncio.Task] = None
-        self._accum = 0.0  # for slot timing
-        self._mqtt_accum = 0.0  # for MQTT processing
+        self.dt = 0.02  # mobility step (seconds)
+        self.mqtt_interval = 0.1  # Process MQTT every 100ms while there is MQTT work
+        self._mac_event: Optional[list] = None  # scheduled handles (None = layer idle)
+        self._mac_skip: Optional[Tuple[int, int]] = None  # (first skipped slot, landing slot) of a backoff fast-forward
+        self._mqtt_event: Optional[list] = None
+        self._mobility_event: Optional[list] = None
+        self._route_trigger_event: Optional[list] = None
+        self._route_links: Optional[Connectivity] = None  # adjacency the last route-ad round went out over
+        self._ad_links: Optional[Connectivity] = None  # adjacency the last ads (round or triggered) went out over
+        self._mobility_last: Dict[int, float] = {}  # node_id -> sim time of last position update
+        self.traffic_sources: Dict[int, TrafficSource] = {}  # source id -> in-simulation traffic generator
+        self._next_source_id = 1
+        self._topology_dirty = False  # a node moved/appeared since the last MQTT connectivity check
+        self.speed = 1.0  # sim seconds per wall-clock second (0 = as fast as possible)
+        self.max_slice = 0.05  # max wall time (seconds) spent stepping before yielding to the event loop
+        self._pace_anchor: Optional[Tuple[float, float]] = None  # (wall time, sim time) pacing reference
+        self._until_waiters: List[Tuple[float, asyncio.Future]] = []  # (sim time, future) for run_until callers
+        self._resume_running = False  # running state to go back to once the last run_until target is reached
         self.bounds = (0, 0, 400, 233)  # Canvas bounds for mobility (matches 1200x700 canvas / 3 scale)
+        self._init_schedule()
+    
+    def _init_schedule(self):
+        """Seed the event queue of a fresh engine with the periodic timers"""
+        self._mac_event = None
+        self._mac_skip = None
+        self._mqtt_event = None
+        self._mobility_event = None
+        self._route_trigger_event = None
+        self._route_links = None
+        self._ad_links = None
+        self.engine.scheduler.schedule(self.network.route_ad_interval, self._route_ad_tick)
+    
+    def _new_mac(self) -> Mac:
+        cfg = self.mac_cfg if self.mac_cfg is not None else MacConfig(channel=self.channel)
+        return Mac(seed=self.seed, cfg=cfg, range_checker=self._check_range,
+                   forward_callback=self._forward_packet, wake_callback=self._wake_mac,
+                   interference_callback=self._interferers)
+
+    def _new_network(self) -> NetworkLayer:
+        matrix = RouteMatrix() if self.route_tables == "array" else None
+        self._check_routing(self.routing, matrix)
+        mode, round_mode = ROUTING_MODES[self.routing]
+        return NetworkLayer(mode=mode, round_mode=round_mode, oracle=RouteOracle(self.links), matrix=matrix)
+    
+    def get_node(self, node_id: int) -> Optional[Node]:
+        """Look a node up by id (None if it does not exist)"""
+        return self.node_index.get(node_id)
     
+    def links(self) -> Connectivity:
+        """All PHY links, computed in bulk once per topology version"""
+        links = self._links
+        if links is not None and links.version == self.topology_version:
+            return links
+        ids = [n.id for n in self.nodes]
+        if np is None or len(ids) < BULK_LINKS_MIN_NODES:
+            links = connectivity_from_neighbors(self.topology_version, ids, self.get_neighbors)
+        elif self.arrays is not None:
+            slots = np.fromiter((n.slot for n in self.nodes), dtype=np.int64, count=len(ids))
+            a = self.arrays
+            links = build_connectivity(self.topology_version, ids, a.x[slots], a.y[slots], a.ranges[a.phy[slots]], MAX_RANGE)
+        else:
+            links = build_connectivity(
+                self.topology_version, ids,
+                [n.pos.x for n in self.nodes], [n.pos.y for n in self.nodes],
+                [PHY_PROFILES[n.phy]["range"] for n in self.nodes], MAX_RANGE,
+            )
+        self._links = links
+        return links
+    
+    def _interferers(self, node_id: int) -> FrozenSet[int]:
+        """Nodes within interference range of node_id (its PHY links, from the bulk adjacency)"""
+        return self.links().neighbors(node_id)
+
     def _check_range(self, src_id: int, dst_id: int) -> bool:
         """Check if two nodes are within PHY range of each other"""
-        src = next((n for n in self.nodes if n.id == src_id), None)
-        dst = next((n for n in self.nodes if n.id == dst_id), None)
+        links = self._links
+        if links is not None and links.version == self.topology_version and src_id != dst_id:
+            return links.linked(src_id, dst_id)
+        cached = self.neighbor_cache.get_pair(src_id, dst_id)
+        if cached is not None:
+            return cached
+        src = self.node_index.get(src_id)
+        dst = self.node_index.get(dst_id)
         if not src or not dst:
             return False
-        from .engine import in_range
-        return in_range(src, dst)
+        result = self.grid.maybe_within(src_id, dst_id, MAX_RANGE) and in_range(src, dst)
+        self.neighbor_cache.put_pair(src_id, dst_id, result)
+        return result
     
     def _forward_packet(self, pkt: Packet):
         """Forward packet to next hop (multi-hop routing)"""
         current_hop = pkt.next_hop_id
         final_dest = pkt.dst_id
         
+        # Past the hop limit: a transient routing loop, drop packet
+        hops = pkt.hops + 1
+        if hops >= self.network.hop_limit:
+            self.network.hop_limit_drops += 1
+            return
+        
         # Get next hop from current node's routing table
         next_hop = self.network.get_next_hop(current_hop, final_dest)
         if not next_hop:
@@ -66,22 +178,24 @@ class Store:
             return
         
         # Create forwarded packet with current hop as new source for MAC layer
-        forwarded_pkt = Packet(
+        forwarded_pkt = self.mac.new_packet(
             src_id=current_hop,  # Current hop becomes MAC source
             dst_id=pkt.dst_id,   # Keep final destination
             size_bytes=pkt.size_bytes,
             kind=pkt.kind,
             seq=pkt.seq,
             t_created=pkt.t_created,
-            next_hop_id=next_hop  # Next hop in the route
+            next_hop_id=next_hop,  # Next hop in the route
+            origin_id=pkt.origin_id,
+            hops=hops,
         )
         
         # Enqueue at current hop for forwarding
         self.mac.enqueue(forwarded_pkt)
         
         # Add animation for forwarded hop
-        src_node = next((n for n in self.nodes if n.id == current_hop), None)
-        dst_node = next((n for n in self.nodes if n.id == next_hop), None)
+        src_node = self.node_index.get(current_hop)
+        dst_node = self.node_index.get(next_hop)
         if src_node and dst_node:
             self.mac_packets_in_flight.append({
                 'src_id': current_hop,
@@ -94,11 +208,16 @@ class Store:
                 'kind': pkt.kind,
                 'seq': pkt.seq
             })
+            self.wake_mqtt()
 
     def add_node(self, role: str, phy: str, x: float, y: float, mobile: bool = False, speed: float = 0.0, sleep_ratio: float = 0.2) -> int:
         nid = self._next_id; self._next_id += 1
-        node = Node(id=nid, role=role, phy=phy, pos=Position(x, y), is_broker=(role=="broker"), mobile=mobile, speed=speed, sleep_ratio=sleep_ratio)
+        if self.arrays is not None:
+            node = ArrayNode(self.arrays, id=nid, role=role, phy=phy, x=x, y=y, is_broker=(role=="broker"), mobile=mobile, speed=speed, sleep_ratio=sleep_ratio)
+        else:
+            node = Node(id=nid, role=role, phy=phy, pos=Position(x, y), is_broker=(role=="broker"), mobile=mobile, speed=speed, sleep_ratio=sleep_ratio)
         self.nodes.append(node)
+        self.node_index[nid] = node
         kind = "BLE" if phy == "BLE" else ("WiFi" if phy == "WiFi" else "Zigbee")
         self.mac.add_node(node_id=nid, kind=kind)
         self.network.init_node(nid)  # Initialize network layer routing
@@ -117,11 +236,20 @@ class Store:
                 nid, speed, pause_time=2.0, 
                 max_radius=70.0, center_x=x, center_y=y
             )
+            self._wake_mobility(nid)
         
+        self._node_moved(node)
         return nid
 
     def remove_node(self, nid: int):
-        self.nodes = [n for n in self.nodes if n.id != nid]
+        node = self.node_index.pop(nid, None)
+        if node is not None:
+            self.nodes.remove(node)
+            if self.arrays is not None:
+                self.arrays.release(node.slot)
+        cell = self.grid.where.get(nid)
+        self.grid.remove(nid)
+        self.neighbor_cache.invalidate(nid, self.grid.ids_around(cell) if cell is not None else ())
         self.network.remove_node(nid)  # Clean up routing state
         if nid in self.mqtt_brokers:
             del self.mqtt_brokers[nid]
@@ -129,10 +257,17 @@ class Store:
             del self.mqtt_clients[nid]
         if nid in self.mobility_models:
             del self.mobility_models[nid]
+        for source in [s for s in self.traffic_sources.values() if s.node_id == nid]:
+            self.remove_traffic(source.id)
+        self._mobility_last.pop(nid, None)
+        if self.mobility is not None:
+            self.mobility.remove(nid)
+        self._topology_dirty = True
+        self.topology_version += 1
     
     def relocate_broker(self, old_broker_id: int, new_x: float, new_y: float) -> int:
         """Relocate broker to new position (simulates failover)"""
-        old_broker = next((n for n in self.nodes if n.id == old_broker_id), None)
+        old_broker = self.node_index.get(old_broker_id)
         if not old_broker or not old_broker.is_broker:
             return old_broker_id
         
@@ -142,6 +277,7 @@ class Store:
             # Update position
             old_broker.pos.x = new_x
             old_broker.pos.y = new_y
+            self._node_moved(old_broker)
             
             # Trigger reconnection wave for all clients
             for client_id in self.mqtt_clients.keys():
@@ -157,10 +293,17 @@ class Store:
 
     def reset(self):
         self.nodes.clear()
+        self.node_index.clear()
+        self.grid.clear()
+        self.neighbor_cache.clear()
+        self.topology_version += 1
+        self._links = None
         self.logs.clear()
-        self.engine = Engine()
-        self.mac = Mac(seed=123, cfg=MacConfig(), range_checker=self._check_range, forward_callback=self._forward_packet)
-        self.network = NetworkLayer()  # Reset network layer
+        self.arrays = NodeArrays() if self.array_backed else None
+        self.mobility = BatchMobility(self.seed, self.mobility_rng) if self.batch_mobility else None
+        self.engine = Engine(self.arrays)
+        self.mac = self._new_mac()
+        self.network = self._new_network()  # Reset network layer
         self.mqtt_brokers.clear()
         self.mqtt_clients.clear()
         self.mqtt_pending_deliveries.clear()
@@ -169,6 +312,8 @@ class Store:
         self.mqtt_sub_acks_received.clear()
         self.mqtt_pending_broker_publish.clear()
         self.mobility_models.clear()
+        self.traffic_sources.clear()
+        self._next_source_id = 1
         self.mqtt_packets_in_flight.clear()
         self.mac_packets_in_flight.clear()
         self.mqtt_ack_packets.clear()
@@ -177,24 +322,68 @@ class Store:
         self._next_id = 1
         self._next_seq = 1
         self._next_msg_id = 1
-        self.running = False
-        self._accum = 0.0
-        self._mqtt_accum = 0.0
-    
+        self._mobility_last.clear()
+        self._topology_dirty = False
+        self._init_schedule()
+        self._pace_anchor = None
+        self.pause()
+
+    def __getstate__(self) -> dict:
+        # Everything is plain data or bound methods of picklable objects except the
+        # asyncio handles, which belong to the live event loop
+        state = self.__dict__.copy()
+        state["_task"] = None
+        state["_until_waiters"] = []
+        if self._until_waiters:
+            state["running"] = self._resume_running  # the run_until target does not survive the copy
+        state["_pace_anchor"] = None
+        return state
+
+    def snapshot(self) -> bytes:
+        """Full simulation state (nodes, MAC queues + RNG, routing, MQTT, mobility, event queue) as compressed bytes"""
+        return zlib.compress(pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+    @staticmethod
+    def restore(blob: bytes) -> "Store":
+        """Rebuild a Store from snapshot() bytes; it continues exactly where the original was"""
+        store = pickle.loads(zlib.decompress(blob))
+        if not isinstance(store, Store):
+            raise ValueError("not a simulation snapshot")
+        return store
+
+    def fork(self, n: int = 1) -> List["Store"]:
+        """n independent copies of the current state (one snapshot, n restores)"""
+        blob = self.snapshot()
+        return [Store.restore(blob) for _ in range(n)]
+
     def enqueue(self, src_id: int, dst_id: int, n: int = 1, size: int = 100, kind: str = "WiFi") -> int:
         """Enqueue packets for MAC layer transmission"""
-        ok = 0
-        
+        return self.enqueue_flow(src_id, dst_id, n, size, kind)[0]
+
+    def enqueue_batch(self, flows: List[Tuple[int, int, int, int, str]], animate: bool = True) -> List[Tuple[int, int, Optional[str]]]:
+        """Enqueue many (src, dst, n, size, kind) flows; (accepted, dropped, reason) per flow"""
+        out = []
+        for src_id, dst_id, n, size, kind in flows:
+            accepted, reason = self.enqueue_flow(src_id, dst_id, n, size, kind, animate)
+            out.append((accepted, n - accepted, reason))
+        return out
+
+    def enqueue_flow(self, src_id: int, dst_id: int, n: int = 1, size: int = 100, kind: str = "WiFi",
+                     animate: bool = True) -> Tuple[int, Optional[str]]:
+        """
+        Enqueue n packets from src to dst: route and range are resolved once, the packets go
+        into the source's TxQueue in bulk. Returns (accepted, reason packets were refused or None).
+        """
         # Validate source and destination nodes exist
-        src_node = next((x for x in self.nodes if x.id == src_id), None)
-        dst_node = next((x for x in self.nodes if x.id == dst_id), None)
+        src_node = self.node_index.get(src_id)
+        dst_node = self.node_index.get(dst_id)
         if not src_node or not dst_node:
-            return 0
+            return 0, "unknown node"
         
         # Validate PHY type matches source node's PHY
         if src_node.phy != kind:
             # PHY mismatch - source node can't transmit this type
-            return 0
+            return 0, "phy mismatch"
         
         # Determine next hop for routing
         next_hop = self.network.get_next_hop(src_id, dst_id)
@@ -203,95 +392,457 @@ class Store:
         
         # Check if source can reach next hop
         if not self._check_range(src_id, next_hop):
-            return 0
+            return 0, "out of range"
+        if n <= 0:
+            return 0, None
         
-        # Add initial animation for first hop (one per packet)
-        next_hop_node = next((x for x in self.nodes if x.id == next_hop), None)
+        # Add initial animation for first hop (one per packet; later ones would start at progress >= 1 and vanish)
+        next_hop_node = self.node_index.get(next_hop) if animate else None
         if next_hop_node:
-            for i in range(n):
-                self.mac_packets_in_flight.append({
-                    'src_id': src_id,
-                    'dst_id': next_hop,
-                    'src_x': src_node.pos.x,
-                    'src_y': src_node.pos.y,
-                    'dst_x': next_hop_node.pos.x,
-                    'dst_y': next_hop_node.pos.y,
-                    'progress': i * 0.02,
-                    'kind': kind,
-                    'seq': self._next_seq + i
-                })
-        
-        for _ in range(n):
-            # Create packet with next_hop_id for MAC layer
-            pkt = Packet(
-                src_id=src_id, 
-                dst_id=dst_id,  # Final destination
-                size_bytes=size, 
-                kind=kind, 
-                seq=self._next_seq, 
-                t_created=self.engine.now,
-                next_hop_id=next_hop  # MAC destination
+            base = {
+                'src_id': src_id,
+                'dst_id': next_hop,
+                'src_x': src_node.pos.x,
+                'src_y': src_node.pos.y,
+                'dst_x': next_hop_node.pos.x,
+                'dst_y': next_hop_node.pos.y,
+            }
+            seq = self._next_seq
+            self.mac_packets_in_flight.extend(
+                {**base, 'progress': i * 0.02, 'kind': kind, 'seq': seq + i}
+                for i in range(min(n, ANIMATED_PER_FLOW))
             )
-            self._next_seq += 1
-            if self.mac.enqueue(pkt):
-                ok += 1
-        return ok
+            self.wake_mqtt()
+        
+        # Packets carry next_hop_id for the MAC layer; dropped ones still use up their sequence numbers
+        seq = self._next_seq
+        self._next_seq += n
+        accepted = self.mac.enqueue_many(src_id, dst_id, n, size, kind, seq, self.engine.now, next_hop)
+        return accepted, (None if accepted == n else "queue full")
     
-    def get_neighbors(self, node_id: int) -> Set[int]:
+    def add_traffic(self, kind: str, node_id: int, rate: float, dsts: Sequence[int] = (), **options) -> TrafficSource:
+        """
+        Attach a traffic generator ("cbr", "poisson" or "onoff") to a node. It emits on the sim
+        clock from `start` (default: now) until `stop` / `count`; see sim/traffic.py for options.
+        """
+        cls = SOURCE_KINDS.get(kind)
+        if cls is None:
+            raise ValueError(f"unknown traffic kind {kind!r}")
+        if node_id not in self.node_index:
+            raise ValueError(f"node {node_id} not found")
+        sid = self._next_source_id
+        self._next_source_id += 1
+        options["start"] = max(self.engine.now, options.get("start") or 0.0)
+        source = cls(sid, node_id, rate, f"{self.seed}:traffic:{sid}", dsts, **options)
+        self.traffic_sources[sid] = source
+        t = source.first_time()
+        if not source.exhausted(t):
+            source.event = self.engine.scheduler.schedule(t, self._traffic_tick, sid)
+        return source
+
+    def remove_traffic(self, source_id: int) -> bool:
+        source = self.traffic_sources.pop(source_id, None)
+        if source is None:
+            return False
+        self.engine.scheduler.cancel(source.event)
+        source.event = None
+        return True
+
+    def _traffic_tick(self, source_id: int):
+        """One emission of a traffic source, then schedule its next one"""
+        source = self.traffic_sources.get(source_id)
+        if source is None:
+            return
+        source.event = None
+        node = self.node_index.get(source.node_id)
+        dst = source.destination(self.nodes)
+        source.generated += 1
+        if node is not None and dst is not None:
+            accepted, _ = self.enqueue_flow(source.node_id, dst, 1, source.size, node.phy, source.animate)
+        else:
+            accepted = 0
+        source.accepted += accepted
+        source.dropped += 1 - accepted
+        now = self.engine.now
+        t = source.next_time(now)
+        if t is not None and not source.exhausted(t):
+            source.event = self.engine.scheduler.schedule(max(t, now), self._traffic_tick, source_id)
+
+    def get_neighbors(self, node_id: int) -> FrozenSet[int]:
         """Get set of neighbor node IDs in PHY range"""
-        node = next((n for n in self.nodes if n.id == node_id), None)
+        cached = self.neighbor_cache.get_neighbors(node_id)
+        if cached is not None:
+            return cached
+        node = self.node_index.get(node_id)
         if not node:
-            return set()
+            return frozenset()
         
         neighbors = set()
-        from .engine import in_range
-        for other in self.nodes:
+        radius = PHY_PROFILES[node.phy]["range"]
+        for other in self.grid.query(node.pos.x, node.pos.y, radius):
             if other.id != node_id and in_range(node, other):
                 neighbors.add(other.id)
-        return neighbors
+        return self.neighbor_cache.put_neighbors(node_id, neighbors)
 
-    async def loop(self):
-        # basic discrete time loop
-        dt = 0.02
+    @staticmethod
+    def _check_routing(mode: str, matrix: Optional[RouteMatrix]):
+        if mode not in ROUTING_MODES:
+            raise ValueError(f"unknown routing mode {mode!r}")
+        if mode == "jacobi" and matrix is None:
+            raise ValueError("jacobi routing needs array route tables")
+
+    def set_routing(self, mode: str):
+        """Switch between the distance-vector protocol (sequential or synchronous rounds) and the BFS route oracle"""
+        self._check_routing(mode, self.network.matrix)
+        net_mode, round_mode = ROUTING_MODES[mode]
+        if net_mode == "dv" and self.network.mode != "dv":
+            self.network.force_full = True  # tables went stale while the oracle was routing
+        self.routing = mode
+        self.network.mode = net_mode
+        self.network.round_mode = round_mode
+    
+    def set_speed(self, factor: float):
+        """Set sim speed as a multiple of real time (0 or less = as fast as possible)"""
+        self.speed = max(0.0, factor)
+        self._pace_anchor = None  # re-anchor pacing against the wall clock
+    
+    def _node_moved(self, node: Node):
+        """Record that a node's position changed (or it was added)"""
+        old_cell = self.grid.where.get(node.id)
+        self.grid.update(node)
+        new_cell = self.grid.where[node.id]
+        # Only neighborhoods within one cell (= max range) of the old or new position can change
+        nearby = set(self.grid.ids_around(new_cell))
+        if old_cell is not None and old_cell != new_cell:
+            nearby.update(self.grid.ids_around(old_cell))
+        self.neighbor_cache.invalidate(node.id, nearby)
+        self.topology_version += 1
+        self._topology_dirty = True
+        if self.mqtt_clients:
+            self.wake_mqtt()
+    
+    def _wake_mac(self):
+        """Schedule the next MAC slot when traffic arrives at an idle MAC"""
+        if self._mac_event is not None:
+            self._settle_mac()  # a new contender: stop fast-forwarding past it
+            return
         slot_s = self.mac.cfg.slot_ms / 1000.0
-        mqtt_interval = 0.1  # Process MQTT every 100ms
-        
-        while True:
-            if self.running:
-                # Update mobile node positions
+        slot = int(self.engine.now / slot_s + 1e-9) + 1
+        self._mac_event = self.engine.scheduler.schedule(slot * slot_s, self._mac_tick, slot)
+    
+    def _mac_tick(self, slot: int):
+        """MAC slot event; keeps rescheduling itself only while packets are queued"""
+        mac = self.mac
+        if self._mac_skip is not None:
+            mac.countdown(slot - self._mac_skip[0])
+            self._mac_skip = None
+        mac.slot_index = slot - 1  # slots skipped while idle still count towards MAC time
+        mac.tick()
+        if mac.backlog > 0:
+            slot_s = mac.cfg.slot_ms / 1000.0
+            nxt = slot + 1
+            idle = mac.idle_slots()
+            if idle:
+                # Every contender is counting down: jump to the slot where the first one sends,
+                # but not past the next event (it could bring a new contender)
+                landing = nxt + idle
+                horizon = self.engine.scheduler.peek_time()
+                if horizon is not None:
+                    landing = min(landing, int(horizon / slot_s + 1e-9))
+                if landing > nxt:
+                    self._mac_skip = (nxt, landing)
+                    nxt = landing
+            self._mac_event = self.engine.scheduler.schedule(nxt * slot_s, self._mac_tick, nxt)
+        else:
+            self._mac_event = None
+    
+    def _settle_mac(self):
+        """Apply the part of a pending backoff fast-forward whose slots have already passed"""
+        if self._mac_skip is None:
+            return
+        first, landing = self._mac_skip
+        slot_s = self.mac.cfg.slot_ms / 1000.0
+        done = int(self.engine.now / slot_s + 1e-9)
+        if done * slot_s > self.engine.now:
+            done -= 1  # slot times are done * slot_s, so compare exactly
+        done = min(done, landing - 1)  # last slot that would have ticked by now
+        self.mac.countdown(done - first + 1)
+        self._mac_skip = None
+        if done + 1 < landing:
+            self.engine.scheduler.cancel(self._mac_event)
+            self._mac_event = self.engine.scheduler.schedule((done + 1) * slot_s, self._mac_tick, done + 1)
+    
+    def wake_mqtt(self):
+        """Schedule MQTT processing at the next interval boundary if it is idle"""
+        if self._mqtt_event is not None:
+            return
+        k = int(self.engine.now / self.mqtt_interval + 1e-9) + 1
+        self._mqtt_event = self.engine.scheduler.schedule(k * self.mqtt_interval, self._mqtt_tick, k)
+    
+    def _mqtt_busy(self) -> bool:
+        """True while the MQTT layer has pending work, animations or retransmissions"""
+        if self._topology_dirty and self.mqtt_clients:
+            return True
+        if (self.mqtt_pending_deliveries or self.mqtt_pending_pub_acks or self.mqtt_pending_sub_acks
+                or self.mqtt_pending_broker_publish or self.mqtt_packets_in_flight
+                or self.mac_packets_in_flight or self.mqtt_ack_packets):
+            return True
+        return any(b.pending_acks or b.message_queue for b in self.mqtt_brokers.values())
+    
+    def _mqtt_tick(self, k: int):
+        self._process_mqtt()
+        if self._mqtt_busy():
+            self._mqtt_event = self.engine.scheduler.schedule((k + 1) * self.mqtt_interval, self._mqtt_tick, k + 1)
+        else:
+            self._mqtt_event = None
+    
+    def _route_ad_tick(self):
+        """Periodic route advertisement round"""
+        now = self.engine.now
+        net = self.network
+        net.last_route_ad = now
+        if net.mode == "oracle":
+            # Routes come straight from the adjacency; nothing to advertise
+            self.engine.scheduler.schedule(now + net.route_ad_interval, self._route_ad_tick)
+            return
+        full = net.next_round_full()
+        # Positions are fixed for the whole round: one bulk adjacency for every neighborhood
+        links = self.links()
+        prev = self._route_links
+        changed = prev is None or prev.version != links.version
+        # Nodes that lost routes since the last round re-learn them now, after their withdrawals had
+        # a round to spread; routes lost to links broken right now wait for the next round
+        relearn = net.take_lost()
+        self._links_down(links)
+        if net.round_mode == "jacobi" and net.matrix is not None:
+            self._jacobi_round(full, prev if changed else links, links, set(relearn))
+        else:
+            # Neighbors re-send the routes those around them lost (poisoned reverse keeps them from routing back through us)
+            if relearn:
                 for node in self.nodes:
-                    if node.mobile and node.id in self.mobility_models:
-                        model = self.mobility_models[node.id]
-                        new_x, new_y = model.update_position(node.pos.x, node.pos.y, dt, self.bounds)
-                        node.pos.x = new_x
-                        node.pos.y = new_y
-                
-                self.engine.tick(self.nodes, dt)
-                
-                # Network layer: periodic route advertisements
-                if self.network.should_send_route_ad(self.engine.now):
+                    targets = links.neighbors(node.id) & relearn.keys()
+                    if targets:
+                        dests = set().union(*(relearn[t] for t in targets))
+                        self._advertise(net.full_advertisement(node.id, dests), targets, links)
+            if full:
+                for node in self.nodes:
+                    self._advertise(net.generate_route_advertisement(node.id), links.neighbors(node.id), links)
+            else:
+                if changed:
+                    # Links that appeared since the last round: both ends exchange full tables
                     for node in self.nodes:
-                        # Each node broadcasts its routing table to neighbors
-                        ad = self.network.generate_route_advertisement(node.id)
-                        neighbors = self.get_neighbors(node.id)
-                        
-                        # All neighbors process the advertisement
-                        for neighbor_id in neighbors:
-                            receiver_neighbors = self.get_neighbors(neighbor_id)
-                            self.network.process_route_advertisement(ad, neighbor_id, receiver_neighbors)
-                
-                # MAC layer slots
-                self._accum += dt
-                while self._accum >= slot_s:
-                    self.mac.tick()
-                    self._accum -= slot_s
-                
-                # MQTT layer: process messages and retransmissions
-                self._mqtt_accum += dt
-                if self._mqtt_accum >= mqtt_interval:
-                    self._process_mqtt()
-                    self._mqtt_accum = 0.0
-            await asyncio.sleep(dt)
+                        new = links.neighbors(node.id) - prev.neighbors(node.id) if prev is not None else links.neighbors(node.id)
+                        if new:
+                            self._advertise(net.full_advertisement(node.id), new, links)
+                self._advertise_pending(links)
+        self._route_links = self._ad_links = links
+        self.engine.scheduler.schedule(now + net.route_ad_interval, self._route_ad_tick)
+        self._schedule_triggered_ad()
+    
+    def _links_down(self, links: Connectivity):
+        """Invalidate routes over links that broke since ads last went out (withdrawn with the next ads)"""
+        prev = self._ad_links
+        if prev is None or prev.version == links.version:
+            return
+        net = self.network
+        for node in self.nodes:
+            gone = prev.neighbors(node.id) - links.neighbors(node.id)
+            for other in gone:
+                if node.id < other or other not in links.row_of:
+                    net.link_down(node.id, other)
+    
+    def _jacobi_round(self, full: bool, prev: Optional[Connectivity], links: Connectivity, lost: Set[int]):
+        """
+        The whole round as one synchronous min-plus step: advertisers with pending changes (all
+        nodes on a full round) reach every neighbor, new links and nodes that lost routes get full tables.
+        Changes (withdrawals included) spread one hop per round, like synchronous distance vector.
+        """
+        pending = self.network.pending_nodes()
+        adv: List[int] = []
+        recv: List[int] = []
+        for node in self.nodes:
+            nbrs = links.neighbors(node.id)
+            if full or node.id in pending:
+                targets = nbrs
+            else:
+                targets = (nbrs - prev.neighbors(node.id) if prev is not None else nbrs) | (nbrs & lost)
+            adv.extend([node.id] * len(targets))
+            recv.extend(targets)
+        withdrew = self.network.synchronous_round(adv, recv)
+        # Withdrawals don't wait a round per hop (like triggered updates): pass them on until nobody loses more
+        while withdrew:
+            adv, recv = [], []
+            for nid in withdrew:
+                nbrs = links.neighbors(nid)
+                adv.extend([nid] * len(nbrs))
+                recv.extend(nbrs)
+            withdrew = self.network.synchronous_round(adv, recv)
+    
+    def _triggered_ad_tick(self):
+        """Triggered update: nodes whose tables changed advertise just the changes"""
+        self._route_trigger_event = None
+        links = self.links()
+        self._links_down(links)
+        self._advertise_pending(links)
+        self._ad_links = links
+        self._schedule_triggered_ad()
+    
+    def _schedule_triggered_ad(self):
+        net = self.network
+        if net.incremental and net.round_mode != "jacobi" and self._route_trigger_event is None and net.pending_nodes():
+            self._route_trigger_event = self.engine.scheduler.schedule(self.engine.now + net.triggered_delay, self._triggered_ad_tick)
+    
+    def _advertise_pending(self, links: Connectivity):
+        """Delta ads from every node with unadvertised changes (node order, like a full round)"""
+        net = self.network
+        pending = net.pending_nodes()
+        for node in self.nodes:
+            if node.id in pending and net.dirty[node.id]:
+                self._advertise(net.generate_route_advertisement(node.id, full=False), links.neighbors(node.id), links)
+    
+    def _advertise(self, ad: RouteAdvertisement, receivers, links: Connectivity):
+        # All neighbors process the advertisement
+        self.network.broadcast(ad, receivers, links.neighbors)
+    
+    def _wake_mobility(self, nid: int):
+        """Start tracking a new mobile node; pulls the next mobility event in to the next step"""
+        now = self.engine.now
+        self._mobility_last[nid] = now
+        if self.mobility is not None:
+            node = self.node_index[nid]
+            self.mobility.add(self.mobility_models[nid], now, node.slot if self.arrays is not None else -1)
+        ev = self._mobility_event
+        if ev is not None and ev[0] <= now + self.dt:
+            return
+        self.engine.scheduler.cancel(ev)
+        self._mobility_event = self.engine.scheduler.schedule(now + self.dt, self._mobility_tick)
+    
+    def _mobility_tick(self):
+        """Move mobile nodes; steps every dt while any node moves, otherwise sleeps until the first pause ends"""
+        if self.mobility is not None:
+            return self._batch_mobility_tick()
+        now = self.engine.now
+        next_in: Optional[float] = None
+        for nid, model in self.mobility_models.items():
+            node = self.node_index[nid]
+            if not node.mobile:
+                continue
+            elapsed = now - self._mobility_last.get(node.id, now)
+            self._mobility_last[node.id] = now
+            if elapsed > 0:
+                new_x, new_y = model.update_position(node.pos.x, node.pos.y, elapsed, self.bounds)
+                if new_x != node.pos.x or new_y != node.pos.y:
+                    node.pos.x = new_x
+                    node.pos.y = new_y
+                    self._node_moved(node)
+            wait = model.next_move_in()
+            if wait is not None and (next_in is None or wait < next_in):
+                next_in = wait
+        if next_in is None:
+            self._mobility_event = None
+        else:
+            self._mobility_event = self.engine.scheduler.schedule(now + max(self.dt, next_in), self._mobility_tick)
+    
+    def _batch_mobility_tick(self):
+        """_mobility_tick for BatchMobility: gather positions, one vectorized step, scatter back"""
+        import numpy as np
+        mob = self.mobility
+        now = self.engine.now
+        n = len(mob)
+        ids = mob.node_id[:n]
+        if self.arrays is not None:
+            slots = mob.slot[:n]
+            x, y = self.arrays.x[slots], self.arrays.y[slots]
+        else:
+            nodes = [self.node_index[int(i)] for i in ids]
+            x = np.array([nd.pos.x for nd in nodes])
+            y = np.array([nd.pos.y for nd in nodes])
+        moved = mob.step(now, x, y, self.bounds)
+        if self.arrays is not None:
+            self.arrays.x[slots] = x
+            self.arrays.y[slots] = y
+        for i in np.flatnonzero(moved):
+            node = self.node_index[int(ids[i])]
+            if self.arrays is None:
+                node.pos.x = float(x[i])
+                node.pos.y = float(y[i])
+            self._node_moved(node)
+        next_in = mob.next_move_in()
+        if next_in is None:
+            self._mobility_event = None
+        else:
+            self._mobility_event = self.engine.scheduler.schedule(now + max(self.dt, next_in), self._mobility_tick)
+    
+    def advance(self, until: float, deadline: Optional[float] = None) -> bool:
+        """
+        Run the simulation until sim time reaches `until` (headless, no pacing).
+        Stops early (returns False) if the wall clock passes `deadline` (time.perf_counter()).
+        """
+        done = self.engine.run_until(until, deadline)
+        self.engine.settle(self.nodes)
+        self._settle_mac()  # callers may enqueue, reconfigure or snapshot between advances
+        return done
+    
+    def pump(self, budget: Optional[float] = None):
+        """
+        Run one paced slice of the simulation: catch sim time up to the wall clock
+        scaled by `speed`, spending at most `budget` seconds of wall time.
+        """
+        if not self.running:
+            self._pace_anchor = None
+            return
+        
+        wall = time.perf_counter()
+        deadline = wall + (self.max_slice if budget is None else budget)
+        if self.speed > 0:
+            if self._pace_anchor is None:
+                self._pace_anchor = (wall, self.engine.now)
+            anchor_wall, anchor_sim = self._pace_anchor
+            target = anchor_sim + (wall - anchor_wall) * self.speed
+        else:
+            target = float("inf")
+        if self._until_waiters:
+            target = min(target, min(t for t, _ in self._until_waiters))
+        
+        done = self.advance(target, deadline)
+        
+        # Fell behind the requested speed: re-anchor instead of building up a backlog
+        if self.speed > 0 and not done:
+            self._pace_anchor = None
+        self._release_waiters()
+    
+    async def run_until(self, t: float) -> float:
+        """Run the simulation until sim time t, then pause. Returns the sim time reached."""
+        if self.engine.now >= t:
+            return self.engine.now
+        fut = asyncio.get_running_loop().create_future()
+        if not self._until_waiters:
+            self._resume_running = self.running
+        self._until_waiters.append((t, fut))
+        self.running = True
+        return await fut
+    
+    def pause(self):
+        """Stop the simulation; pending run_until callers return the current sim time"""
+        self.running = False
+        self._resume_running = False
+        self._release_waiters(force=True)
+    
+    def _release_waiters(self, force: bool = False):
+        """Resolve run_until callers whose target time was reached (or all of them if force)"""
+        if not self._until_waiters:
+            return
+        now = self.engine.now
+        remaining = []
+        for t, fut in self._until_waiters:
+            if force or now >= t:
+                if not fut.done():
+                    fut.set_result(now)
+            else:
+                remaining.append((t, fut))
+        self._until_waiters = remaining
+        if not remaining and not force:
+            self.running = self._resume_running  # last target reached: back to the state before run_until
     
     def _process_mqtt(self):
         """Process MQTT messages and retransmissions"""
@@ -306,12 +857,13 @@ class Store:
                     pass
         
         # Check connectivity for all MQTT clients (with hysteresis to prevent rapid toggling)
+        self._topology_dirty = False
         for client_id, client in self.mqtt_clients.items():
             broker_id = next(iter(self.mqtt_brokers.keys()), None)
             if not broker_id:
                 continue
             
-            in_range = self._check_range(broker_id, client_id)
+            in_range = self._check_range(broker_id, client_id)  # reads the bulk links when they are current
             
             # Only change state if it's different from current state
             if in_range and not client.connected:
@@ -335,8 +887,8 @@ class Store:
             # Only deliver if client is connected
             if client.connected and broker_id:
                 # Add packet animation
-                broker_node = next((n for n in self.nodes if n.id == broker_id), None)
-                client_node = next((n for n in self.nodes if n.id == sub_id), None)
+                broker_node = self.node_index.get(broker_id)
+                client_node = self.node_index.get(sub_id)
                 if broker_node and client_node:
                     pkt_id = f"{broker_id}-{sub_id}-{msg.msg_id}"
                     self.mqtt_packets_in_flight.append({
@@ -417,8 +969,8 @@ class Store:
         for sub_id, broker_id, msg_id, pkt_id in self.mqtt_pending_sub_acks:
             if pkt_id in completed_packets:
                 # Packet arrived, send ACK
-                sub_node = next((n for n in self.nodes if n.id == sub_id), None)
-                broker_node = next((n for n in self.nodes if n.id == broker_id), None)
+                sub_node = self.node_index.get(sub_id)
+                broker_node = self.node_index.get(broker_id)
                 if sub_node and broker_node:
                     self.mqtt_ack_packets.append({
                         'id': f"ack-{sub_id}-{broker_id}-{msg_id}",
@@ -488,8 +1040,8 @@ class Store:
                 # Check if publisher is in range
                 if self._check_range(pub_id, broker_id):
                     # Send ACK animation
-                    pub_node = next((n for n in self.nodes if n.id == pub_id), None)
-                    broker_node = next((n for n in self.nodes if n.id == broker_id), None)
+                    pub_node = self.node_index.get(pub_id)
+                    broker_node = self.node_index.get(broker_id)
                     if pub_node and broker_node:
                         self.mqtt_ack_packets.append({
                             'id': f"ack-{broker_id}-{pub_id}-{msg_id}",
@@ -0,0 +1,111 @@
+"""
+Parameter sweeps
+- Each (parameter set x seed) point runs headless on its own Store (no wall-clock waits)
+- Points fan out over the job manager's process pool (jobs.py); a sweep takes about as long as its slowest point
+- Replications are aggregated as mean +/- a Student-t confidence interval
+"""
+from __future__ import annotations
+import json
+import math
+from dataclasses import fields
+from typing import Dict, List, Sequence
+
+from .store import Store
+from .types import MacConfig
+
+METRICS = ("pdr", "avg_latency_ms", "avg_energy", "delivered")
+
+# Default line-topology spacing per PHY (BLE range 15, WiFi range 55)
+DEFAULT_SPACING = {"BLE": 12.0, "WiFi": 30.0}
+
+# Two-sided 95% Student-t critical values by degrees of freedom (normal approximation beyond 30)
+_T95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+def t_critical(df: int) -> float:
+    return _T95[df - 1] if df <= len(_T95) else 1.96
+
+# Warmed-up (routing converged) snapshots, per worker process
+WARM_PARAMS = ("phy", "sleep_ratio", "nodes", "spacing", "routing", "route_tables", "warmup", "mac")
+WARM_CACHE_SIZE = 32
+_warm: Dict[str, bytes] = {}
+
+def _warm_store(params: dict, seed: int) -> Store:
+    """Topology built and routed up to the warmup time; points sharing it restore one snapshot"""
+    key = json.dumps([[params.get(k) for k in WARM_PARAMS], seed], sort_keys=True, default=str)
+    blob = _warm.get(key)
+    if blob is not None:
+        return Store.restore(blob)
+
+    phy = params.get("phy", "WiFi")
+    spacing = params.get("spacing") or DEFAULT_SPACING.get(phy, 30.0)
+    routing = params.get("routing", "dv")
+    # MAC overrides go in at construction: Mac sizes state like its dedup window from the config
+    mac_overrides = {k: v for k, v in params.get("mac", {}).items() if k in {f.name for f in fields(MacConfig)}}
+    store = Store(seed=seed, routing=routing, route_tables=params.get("route_tables", "array" if routing == "jacobi" else "dict"),
+                  mac_cfg=MacConfig(**mac_overrides) if mac_overrides else None)
+    for i in range(params.get("nodes", 3)):
+        store.add_node("sensor", phy, 100 + spacing * i, 100, sleep_ratio=params.get("sleep_ratio", 0.0))
+
+    # Wait for routing to stabilize (route advertisements happen every 5s)
+    store.advance(params.get("warmup", 6.0))
+    if len(_warm) >= WARM_CACHE_SIZE:
+        _warm.pop(next(iter(_warm)))
+    _warm[key] = store.snapshot()
+    return store
+
+def run_point(params: dict, seed: int) -> dict:
+    """
+    One headless run: a line of `nodes` nodes, `packets` packets from the first to the
+    last after the routing warmup, metrics sampled `duration` sim seconds later.
+    `traffic` (one spec or a list) attaches generators instead, first node to last by default,
+    e.g. {"kind": "poisson", "rate": 50}; they run for the whole `duration`.
+    """
+    phy = params.get("phy", "WiFi")
+    warmup = params.get("warmup", 6.0)
+    duration = params.get("duration", 10.0)
+
+    store = _warm_store(params, seed)
+    ids = [n.id for n in store.nodes]
+    traffic = params.get("traffic") or []
+    if isinstance(traffic, dict):
+        traffic = [traffic]
+    enqueued = store.enqueue(ids[0], ids[-1], n=params.get("packets", 0 if traffic else 30), size=params.get("size", 100), kind=phy)
+    sources = [
+        store.add_traffic(spec["kind"], spec.get("node", ids[0]), spec["rate"], spec.get("dsts", [ids[-1]]),
+                          size=spec.get("size", params.get("size", 100)), stop=warmup + duration,
+                          **{k: spec[k] for k in ("pick", "count", "on_mean", "off_mean") if k in spec})
+        for spec in traffic
+    ]
+    store.advance(warmup + duration)
+    enqueued += sum(s.accepted for s in sources)
+
+    m = store.mac.metrics
+    return {
+        "seed": seed,
+        "pdr": m.pdr,
+        "avg_latency_ms": (m.rtt_ms_total / m.rtt_samples) if m.rtt_samples else 0.0,
+        "avg_energy": sum(n.energy for n in store.nodes) / len(store.nodes) if store.nodes else 100.0,
+        "delivered": m.dequeued_ok,
+        "enqueued": enqueued,
+        "simulation_time": store.engine.now,
+    }
+
+def summarize(samples: Sequence[float]) -> dict:
+    """Mean, sample std dev and 95% CI half-width of one metric across replications"""
+    n = len(samples)
+    if n == 0:
+        return {"mean": 0.0, "std": 0.0, "ci95": 0.0, "n": 0}
+    mean = sum(samples) / n
+    if n == 1:
+        return {"mean": mean, "std": 0.0, "ci95": 0.0, "n": 1}
+    std = math.sqrt(sum((s - mean) ** 2 for s in samples) / (n - 1))
+    return {"mean": mean, "std": std, "ci95": t_critical(n - 1) * std / math.sqrt(n), "n": n}
+
+def aggregate(params: dict, runs: List[dict]) -> dict:
+    return {
+        "params": params,
+        **{name: summarize([r[name] for r in runs]) for name in METRICS},
+        "runs": runs,
+    }
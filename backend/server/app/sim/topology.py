@@ -0,0 +1,113 @@
+"""
+Bulk link computation
+- All PHY links at once from vectorized pairwise distances (numpy, grid-bucketed)
+- Same rule as engine.in_range: distance <= min of both PHY ranges
+- CSR adjacency stamped with the topology version it was built from
+"""
+from __future__ import annotations
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the vectorized build
+    np = None
+
+class Connectivity:
+    """Adjacency snapshot of the whole network (CSR rows in `ids` order)"""
+
+    def __init__(self, version: int, ids: Sequence[int], indptr: Sequence[int], indices: Sequence[int]):
+        self.version = version
+        self.ids = list(ids)
+        self.indptr = indptr
+        self.indices = indices
+        self.row_of: Dict[int, int] = {nid: i for i, nid in enumerate(self.ids)}
+        self._sets: Dict[int, FrozenSet[int]] = {}
+
+    @property
+    def n_links(self) -> int:
+        return int(self.indptr[-1]) // 2 if len(self.indptr) else 0
+
+    def neighbors(self, node_id: int) -> FrozenSet[int]:
+        cached = self._sets.get(node_id)
+        if cached is not None:
+            return cached
+        row = self.row_of.get(node_id)
+        if row is None:
+            return frozenset()
+        cols = self.indices[self.indptr[row]:self.indptr[row + 1]]
+        ids = self.ids
+        cached = frozenset(ids[int(c)] for c in cols)
+        self._sets[node_id] = cached
+        return cached
+
+    def linked(self, a: int, b: int) -> bool:
+        return b in self.neighbors(a)
+
+    def edges(self) -> Iterator[Tuple[int, int]]:
+        """Each link once, as (id_a, id_b) with row(a) < row(b)"""
+        ids = self.ids
+        for row in range(len(ids)):
+            for c in self.indices[self.indptr[row]:self.indptr[row + 1]]:
+                if c > row:
+                    yield ids[row], ids[int(c)]
+
+def build_connectivity(version: int, ids: Sequence[int], x, y, ranges, cell_size: float) -> Connectivity:
+    """Vectorized link build: bucket nodes into cells of cell_size (>= every range), join each cell with its 3x3 block"""
+    n = len(ids)
+    if n == 0:
+        return Connectivity(version, [], [0], [])
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    ranges = np.asarray(ranges, dtype=float)
+    cx = np.floor(x / cell_size).astype(np.int64)
+    cy = np.floor(y / cell_size).astype(np.int64)
+    cx -= cx.min() - 1  # shift so neighbor offsets never go negative
+    cy -= cy.min() - 1
+    width = int(cy.max()) + 2
+    key = cx * width + cy
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+    rows = np.arange(n)
+
+    src_parts: List = []
+    dst_parts: List = []
+    for ddx in (-1, 0, 1):
+        for ddy in (-1, 0, 1):
+            target = key + ddx * width + ddy
+            lo = np.searchsorted(sorted_key, target, side="left")
+            hi = np.searchsorted(sorted_key, target, side="right")
+            counts = hi - lo
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            i = np.repeat(rows, counts)
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            j = order[np.repeat(lo, counts) + offsets]
+            keep = i < j  # every unordered pair is seen from both sides; keep one
+            i, j = i[keep], j[keep]
+            linked = np.hypot(x[i] - x[j], y[i] - y[j]) <= np.minimum(ranges[i], ranges[j])
+            src_parts.append(i[linked])
+            dst_parts.append(j[linked])
+
+    if src_parts:
+        a = np.concatenate(src_parts)
+        b = np.concatenate(dst_parts)
+    else:
+        a = b = np.zeros(0, dtype=np.int64)
+    src = np.concatenate([a, b])
+    dst = np.concatenate([b, a])
+    by_row = np.lexsort((dst, src))
+    src, dst = src[by_row], dst[by_row]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return Connectivity(version, ids, indptr, dst)
+
+def connectivity_from_neighbors(version: int, ids: Sequence[int], neighbors_of: Callable[[int], Iterable[int]]) -> Connectivity:
+    """Pure-Python build from per-node neighbor sets (used when numpy is unavailable)"""
+    row_of = {nid: i for i, nid in enumerate(ids)}
+    indptr = [0]
+    indices: List[int] = []
+    for nid in ids:
+        indices.extend(sorted(row_of[o] for o in neighbors_of(nid) if o in row_of))
+        indptr.append(len(indices))
+    return Connectivity(version, ids, indptr, indices)
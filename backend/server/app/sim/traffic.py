@@ -0,0 +1,123 @@
+"""
+Traffic generators
+- Sources attached to nodes emit packets on the simulation clock (scheduler events), not per HTTP call
+- Constant bit rate, Poisson, and on/off bursty (exponential on/off periods, CBR while on)
+- Destinations: a fixed set (random or round-robin), or any other node
+- Every source has its own seeded RNG, so a run is reproducible whatever else is going on
+"""
+from __future__ import annotations
+import random
+from typing import List, Optional, Sequence
+
+class TrafficSource:
+    """Base traffic source: emission times come from next_time(), destinations from destination()"""
+    kind = "base"
+
+    def __init__(self, source_id: int, node_id: int, rate: float, seed: str, dsts: Sequence[int] = (),
+                 pick: str = "random", size: int = 100, start: float = 0.0, stop: Optional[float] = None,
+                 count: Optional[int] = None, animate: bool = False):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.id = source_id
+        self.node_id = node_id
+        self.rate = rate                # packets per second (while on, for on/off sources)
+        self.dsts: List[int] = list(dsts)
+        self.pick = pick                # "random" or "round_robin" over dsts
+        self.size = size
+        self.start = start
+        self.stop = stop                # sim time after which nothing is emitted
+        self.count = count              # max packets to emit
+        self.animate = animate          # add first-hop UI animations (off: sources are for load, not looks)
+        self.rng = random.Random(seed)
+        self.generated = 0
+        self.accepted = 0
+        self.dropped = 0
+        self.event: Optional[list] = None  # pending scheduler handle
+        self._rr = 0
+
+    def first_time(self) -> float:
+        return self.start
+
+    def next_time(self, now: float) -> Optional[float]:
+        """Time of the emission after the one at `now` (None = done)"""
+        return None
+
+    def destination(self, nodes: Sequence) -> Optional[int]:
+        if self.dsts:
+            if self.pick == "round_robin":
+                dst = self.dsts[self._rr % len(self.dsts)]
+                self._rr += 1
+                return dst
+            return self.rng.choice(self.dsts)
+        if len(nodes) < 2:
+            return None
+        while True:
+            dst = nodes[self.rng.randrange(len(nodes))].id
+            if dst != self.node_id:
+                return dst
+
+    def exhausted(self, t: float) -> bool:
+        return (self.stop is not None and t > self.stop) or (self.count is not None and self.generated >= self.count)
+
+    def view(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "node": self.node_id,
+            "rate": self.rate,
+            "dsts": self.dsts,
+            "pick": self.pick,
+            "size": self.size,
+            "start": self.start,
+            "stop": self.stop,
+            "count": self.count,
+            "generated": self.generated,
+            "accepted": self.accepted,
+            "dropped": self.dropped,
+            "active": self.event is not None,
+        }
+
+class CbrSource(TrafficSource):
+    """Constant bit rate: one packet every 1/rate seconds (times computed from start, so no drift)"""
+    kind = "cbr"
+
+    def next_time(self, now: float) -> Optional[float]:
+        return self.start + self.generated / self.rate
+
+class PoissonSource(TrafficSource):
+    """Poisson arrivals: exponential gaps with mean 1/rate"""
+    kind = "poisson"
+
+    def first_time(self) -> float:
+        return self.start + self.rng.expovariate(self.rate)
+
+    def next_time(self, now: float) -> Optional[float]:
+        return now + self.rng.expovariate(self.rate)
+
+class OnOffSource(TrafficSource):
+    """Bursty on/off: exponential on and off periods (means on_mean / off_mean), CBR at `rate` while on"""
+    kind = "onoff"
+
+    def __init__(self, *args, on_mean: float = 1.0, off_mean: float = 1.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        if on_mean <= 0 or off_mean <= 0:
+            raise ValueError("on_mean and off_mean must be > 0")
+        self.on_mean = on_mean
+        self.off_mean = off_mean
+        self.on_until = self.start
+
+    def first_time(self) -> float:
+        self.on_until = self.start + self.rng.expovariate(1.0 / self.on_mean)
+        return self.start
+
+    def next_time(self, now: float) -> Optional[float]:
+        t = now + 1.0 / self.rate
+        while t > self.on_until:  # burst over: sleep through an off period, then start the next burst
+            t = self.on_until + self.rng.expovariate(1.0 / self.off_mean)
+            self.on_until = t + self.rng.expovariate(1.0 / self.on_mean)
+        return t
+
+    def view(self) -> dict:
+        return {**super().view(), "on_mean": self.on_mean, "off_mean": self.off_mean}
+
+SOURCE_KINDS = {cls.kind: cls for cls in (CbrSource, PoissonSource, OnOffSource)}
@@ -8,4 +8,7 @@ class MacConfig:
     cw_max: int = 1024
     retry_limit: int = 7
     base_loss_prob: float = 0.01
-    collision_losses: bool = True
\ No newline at end of file
+    collision_losses: bool = True
+    dedup_window: int = 4096  # per-flow duplicate detection window, in sequence numbers
+    packet_pool: bool = False  # recycle Packet objects that left the MAC (free-list) instead of allocating per hop
+    channel: str = "global"  # "global" (one shared medium) or "spatial" (per-neighborhood carrier sense and collisions)
\ No newline at end of file
@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(slots=True)
 class Packet:
     src_id: int
     dst_id: int  # Final destination
@@ -9,7 +9,11 @@ class Packet:
     seq: int = 0
     t_created: float = 0.0
     next_hop_id: int = 0  # MAC-level destination (for multi-hop)
+    origin_id: int = 0  # Node that created the packet (src_id changes hop by hop)
+    hops: int = 0  # Hops travelled before this one (forwarding drops the packet at the hop limit)
     
     def __post_init__(self):
         if self.next_hop_id == 0:
-            self.next_hop_id = self.dst_id  # Default to direct transmission
\ No newline at end of file
+            self.next_hop_id = self.dst_id  # Default to direct transmission
+        if self.origin_id == 0:
+            self.origin_id = self.src_id
\ No newline at end of file